@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +49,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'restAPI.middleware.ReadYourWritesMiddleware',
+    'restAPI.middleware.SamplingProfilerMiddleware',
+    'restAPI.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'eventschedulingAPI.urls'
@@ -75,13 +78,114 @@ WSGI_APPLICATION = 'eventschedulingAPI.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# SQLITE_PRODUCTION switches on WAL journaling and the pragmas below, so
+# readers no longer block the writer and writers wait for the lock instead
+# of failing with "database is locked". CONN_MAX_AGE keeps connections (and
+# their page cache) open between requests.
+
+SQLITE_PRODUCTION = config("SQLITE_PRODUCTION", default=False, cast=bool)
+SQLITE_BUSY_TIMEOUT = config("SQLITE_BUSY_TIMEOUT", default=5.0, cast=float)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': config("DATABASE_NAME", default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': config(
+            "DATABASE_CONN_MAX_AGE",
+            default=600 if SQLITE_PRODUCTION else 0, cast=int),
+        'CONN_HEALTH_CHECKS': config(
+            "DATABASE_CONN_HEALTH_CHECKS",
+            default=SQLITE_PRODUCTION, cast=bool),
+        'OPTIONS': {
+            # seconds sqlite3 waits for a lock before raising
+            'timeout': SQLITE_BUSY_TIMEOUT,
+        },
     }
 }
 
+# Read replicas: SQLite copies of the primary refreshed by the
+# refresh_replicas command. Safe requests read from one random replica
+# each, writes and the requests of a client that wrote in the last
+# READ_YOUR_WRITES_WINDOW seconds go to the primary.
+DATABASE_REPLICAS = config("DATABASE_REPLICAS", default="", cast=Csv())
+
+for number, replica_name in enumerate(DATABASE_REPLICAS, start=1):
+    DATABASES['replica{}'.format(number)] = dict(
+        DATABASES['default'], NAME=replica_name,
+        TEST={'MIRROR': 'default'})
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['restAPI.routers.PrimaryReplicaRouter']
+READ_YOUR_WRITES_WINDOW = config("READ_YOUR_WRITES_WINDOW", default=5,
+                                 cast=int)
+
+# Applied to every new SQLite connection by restAPI.signals
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(SQLITE_BUSY_TIMEOUT * 1000),
+    'temp_store': 'MEMORY',
+    'mmap_size': config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024,
+                        cast=int),
+    # negative sizes are KiB rather than pages
+    'cache_size': -config("SQLITE_CACHE_SIZE_KB", default=64 * 1024,
+                          cast=int),
+} if SQLITE_PRODUCTION else {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The event responses cache defaults to a bounded local memory cache,
+# set EVENT_CACHE_BACKEND to django.core.cache.backends.filebased.FileBasedCache
+# and EVENT_CACHE_LOCATION to a directory to share it between processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'events': {
+        'BACKEND': config(
+            "EVENT_CACHE_BACKEND",
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config("EVENT_CACHE_LOCATION", default='event-responses'),
+        'TIMEOUT': config("EVENT_CACHE_TIMEOUT", default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config("EVENT_CACHE_MAX_ENTRIES", default=10000,
+                                  cast=int),
+        },
+    },
+    # clients that wrote recently, must be shared between processes
+    # for read-your-writes to hold when a replica is configured
+    'replication': {
+        'BACKEND': config(
+            "REPLICATION_CACHE_BACKEND",
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config("REPLICATION_CACHE_LOCATION",
+                           default='recent-writers'),
+    },
+    'tokens': {
+        'BACKEND': config(
+            "TOKEN_CACHE_BACKEND",
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config("TOKEN_CACHE_LOCATION", default='auth-tokens'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config("TOKEN_CACHE_MAX_SIZE", default=10000,
+                                  cast=int),
+        },
+    },
+}
+
+EVENT_CACHE_ALIAS = 'events'
+REPLICATION_CACHE_ALIAS = 'replication'
+
+# Authenticated tokens are cached in process for TOKEN_CACHE_TTL seconds,
+# a token deleted or a user deactivated in another process is honoured
+# at the latest after that
+TOKEN_CACHE_ALIAS = 'tokens'
+TOKEN_CACHE_TTL = config("TOKEN_CACHE_TTL", default=60, cast=int)
+TOKEN_CACHE_MAX_SIZE = config("TOKEN_CACHE_MAX_SIZE", default=10000, cast=int)
+EVENT_CACHE_ENABLED = config("EVENT_CACHE_ENABLED", default=True, cast=bool)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -116,6 +220,39 @@ USE_TZ = True
 
 APPEND_SLASH = True
 
+# What happens to the votes of dates that an event update removes:
+# "delete" deletes them with the dates, "reject" refuses the update
+REMOVED_DATE_VOTES = config("REMOVED_DATE_VOTES", default="delete")
+
+# Write-behind vote ingestion: the vote endpoint queues validated votes and
+# answers 202 with a receipt, a background thread commits them in batches
+# of VOTE_BUFFER_FLUSH_SIZE or every VOTE_BUFFER_FLUSH_INTERVAL_MS. Votes
+# beyond VOTE_BUFFER_MAX_SIZE waiting ones are refused with a 503. Other
+# processes report receipts younger than VOTE_BUFFER_PENDING_SECONDS that
+# are not written yet as pending.
+VOTE_BUFFER_ENABLED = config("VOTE_BUFFER_ENABLED", default=False, cast=bool)
+VOTE_BUFFER_MAX_SIZE = config("VOTE_BUFFER_MAX_SIZE", default=10000, cast=int)
+VOTE_BUFFER_FLUSH_SIZE = config("VOTE_BUFFER_FLUSH_SIZE", default=500,
+                                cast=int)
+VOTE_BUFFER_FLUSH_INTERVAL_MS = config("VOTE_BUFFER_FLUSH_INTERVAL_MS",
+                                       default=50, cast=int)
+VOTE_BUFFER_PENDING_SECONDS = config("VOTE_BUFFER_PENDING_SECONDS",
+                                     default=60, cast=int)
+
+# Per route request, query and timing histograms at /api/v1/metrics/ and
+# Server-Timing headers
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+
+# cProfile PROFILING_SAMPLE_RATE of the requests (0 to 1) and the requests
+# of staff tokens sending the PROFILING_HEADER header. The profiles go to
+# PROFILING_DIR, the oldest are deleted beyond PROFILING_MAX_BYTES.
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0,
+                               cast=float)
+PROFILING_HEADER = config("PROFILING_HEADER", default="X-Profile")
+PROFILING_DIR = config("PROFILING_DIR", default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_BYTES = config("PROFILING_MAX_BYTES", default=100 * 1024 * 1024,
+                             cast=int)
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
@@ -131,6 +268,6 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'restAPI.authentication.CachedTokenAuthentication',
     ),
 }
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RestapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restAPI'
+
+    def ready(self):
+        from . import signals  # noqa
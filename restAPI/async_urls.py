@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path(r'event/list/', async_views.event_list, name='async-event-list'),
+    path(r'event/<pk>/', async_views.event_detail,
+         name='async-event-detail'),
+    path(r'event/<pk>/results/', async_views.event_results,
+         name='async-event-results'),
+    path(r'event/<pk>/most-votes/', async_views.event_most_votes,
+         name='async-event-most-votes'),
+]
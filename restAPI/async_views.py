@@ -0,0 +1,212 @@
+from collections import defaultdict
+from functools import wraps
+
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import http_date
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from rest_framework import exceptions, status
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import CachedTokenAuthentication, aauthenticate
+from .conditional import make_etag, not_modified
+from .models import Event, Votes
+from .scheduling import AvailabilityMatrix, schedule_options
+from .tallies import most_voted_dates, most_voted_payload, suitable_dates, \
+    suitable_dates_payload
+from .views import EventListViewSet, EventViewSet, StandardEventPagination
+
+# Read only endpoints written against the async ORM, so under ASGI a slow
+# client holds a coroutine instead of a thread of the sync bridge. They
+# return the same payloads and status codes as their EventViewSet and
+# EventListViewSet counterparts. The list pages by number only, asking it
+# for cursor pagination is a 400.
+
+
+def _error(detail, status_code, headers=None):
+    response = JsonResponse({"detail": str(detail)}, status=status_code)
+    for header, value in (headers or {}).items():
+        response[header] = value
+    return response
+
+
+def async_authenticated(view_func):
+    """
+    Token authentication and IsAuthenticated for an async view, failures
+    get the same 401 body and WWW-Authenticate header as DRF sends.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return _error(exceptions.MethodNotAllowed(request.method).detail,
+                          status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            request.user, request.auth = await aauthenticate(request)
+        except exceptions.APIException as error:
+            return _error(error.detail, status.HTTP_401_UNAUTHORIZED, {
+                "WWW-Authenticate": CachedTokenAuthentication.keyword})
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def _get_event(pk, *fields):
+    try:
+        return await Event.objects.only(*fields).aget(pk=pk)
+    except (Event.DoesNotExist, ValueError):
+        return None
+
+
+async def _conditional(request, event, build):
+    """
+    Same ETag and Last-Modified handling as conditional_event_response,
+    build is only awaited when the client copy is stale.
+    """
+    etag = make_etag(event.id, event.updates, request)
+    if not_modified(request, etag, event.updates):
+        response = HttpResponseNotModified()
+    else:
+        response = await build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(event.updates.timestamp())
+    return response
+
+
+@async_authenticated
+async def event_list(request):
+    pagination = StandardEventPagination
+    if request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET:
+        return JsonResponse(
+            {"pagination": ["Cursor pagination is only served by "
+                            "/api/v1/event/list/"]},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    # the filters of EventListViewSet, with the same validation errors
+    filterset_class = DjangoFilterBackend().get_filterset_class(
+        EventListViewSet, Event.objects.all())
+    filterset = filterset_class(request.GET,
+                                queryset=Event.objects.order_by('id'))
+    if not filterset.is_valid():
+        return JsonResponse(translate_validation(filterset.errors).detail,
+                            status=status.HTTP_400_BAD_REQUEST)
+    events = filterset.qs
+
+    try:
+        page_size = min(int(request.GET[pagination.page_size_query_param]),
+                        pagination.max_page_size)
+        if page_size < 1:
+            raise ValueError
+    except (KeyError, ValueError):
+        page_size = pagination.page_size
+
+    count = await events.acount()
+    try:
+        page = int(request.GET.get(pagination.page_query_param, 1))
+    except ValueError:
+        page = 0
+    last_page = max(1, -(-count // page_size))
+    if not 1 <= page <= last_page:
+        return _error("Invalid page.", status.HTTP_404_NOT_FOUND)
+
+    offset = (page - 1) * page_size
+    rows = [{"id": pk, "name": name} async for pk, name in
+            events.values_list('id', 'name')[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    param = pagination.page_query_param
+    next_link = replace_query_param(url, param, page + 1) \
+        if page < last_page else None
+    if page == 2:
+        previous_link = remove_query_param(url, param)
+    elif page > 2:
+        previous_link = replace_query_param(url, param, page - 1)
+    else:
+        previous_link = None
+
+    return JsonResponse({"count": count, "next": next_link,
+                         "previous": previous_link, "events": rows})
+
+
+@async_authenticated
+async def event_detail(request, pk):
+    event = await _get_event(pk, 'name', 'updates')
+    if event is None:
+        return _error("Not found.", status.HTTP_404_NOT_FOUND)
+
+    async def build():
+        dates = [data async for data in event.dates.all()]
+        voters = defaultdict(list)
+        async for date_id, name in Votes.objects.filter(
+                event=event.id).order_by('id').values_list(
+                'date_voted_id', 'user__name'):
+            voters[date_id].append(name)
+        return JsonResponse({
+            "id": event.id,
+            "name": event.name,
+            "dates": [data.date_suggestion for data in dates],
+            "votes": [{"date": data.date_suggestion,
+                       "people": voters[data.id]}
+                      for data in dates if voters.get(data.id)],
+        })
+
+    return await _conditional(request, event, build)
+
+
+@async_authenticated
+async def event_results(request, pk):
+    try:
+        options = schedule_options(request.GET, EventViewSet.max_top_dates)
+    except exceptions.ValidationError as error:
+        return JsonResponse(error.detail, status=status.HTTP_400_BAD_REQUEST)
+    event = await _get_event(pk, 'name', 'updates')
+    if event is None:
+        return _error("Not found.", status.HTTP_404_NOT_FOUND)
+
+    async def build():
+        if not options:
+            rows = [row async for row in suitable_dates(event.id)]
+            suitable = suitable_dates_payload(rows)
+        else:
+            matrix = await AvailabilityMatrix.afor_event(event.id)
+            if not matrix.has_votes():
+                suitable = suitable_dates_payload([])
+            else:
+                try:
+                    suitable = matrix.schedule(**options)
+                except KeyError as error:
+                    return JsonResponse({"without": [
+                        "{} is not a participant of this event".format(
+                            error.args[0])]},
+                        status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"id": event.id, "name": event.name,
+                             "suitabledates": suitable})
+
+    return await _conditional(request, event, build)
+
+
+@async_authenticated
+async def event_most_votes(request, pk):
+    max_top_dates = EventViewSet.max_top_dates
+    try:
+        top = int(request.GET.get('top', 1))
+    except ValueError:
+        top = 0
+    if not 1 <= top <= max_top_dates:
+        return JsonResponse(
+            {"top": ["Must be an integer between 1 and {}".format(
+                max_top_dates)]},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    event = await _get_event(pk, 'name', 'updates')
+    if event is None:
+        return _error("Not found.", status.HTTP_404_NOT_FOUND)
+
+    async def build():
+        rows = [row async for row in most_voted_dates(event.id, top)]
+        return JsonResponse({"id": event.id, "name": event.name,
+                             "closest_suitable_date":
+                                 most_voted_payload(rows)})
+
+    return await _conditional(request, event, build)
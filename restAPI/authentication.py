@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, \
+    get_authorization_header
+from rest_framework.authtoken.models import Token
+
+
+# Only what authentication needs is cached, never the user row itself
+CachedToken = namedtuple('CachedToken', 'key user_id is_active')
+
+
+class CachedUser:
+    """
+    Stand-in for the user of a cached token. Permission checks only need
+    is_authenticated, any other attribute loads the user on first use.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        self.pk = self.id = user_id
+        self._user = None
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name == '_user':
+            raise AttributeError(name)
+        if self._user is None:
+            self._user = get_user_model().objects.get(pk=self.pk)
+        return getattr(self._user, name)
+
+
+class TokenCache:
+    """
+    Bounded in-process LRU of token key to CachedToken whose entries
+    expire after ttl seconds. Misses fall back to the shared
+    'tokens' Django cache before the database is queried, so tokens warmed
+    by another process are picked up when that cache is shared.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "misses": 0,
+                       "invalidations": 0}
+
+    @staticmethod
+    def _shared():
+        return caches[settings.TOKEN_CACHE_ALIAS]
+
+    @staticmethod
+    def _shared_key(key):
+        return "token:{}".format(key)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return token
+                del self._entries[key]
+
+        token = self._shared().get(self._shared_key(key))
+        with self._lock:
+            if token is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["shared_hits"] += 1
+        self._remember(key, token)
+        return token
+
+    def _remember(self, key, token):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def set(self, key, token):
+        """
+        Cache a Token loaded together with its user.
+        """
+        token = CachedToken(token.key, token.user_id, token.user.is_active)
+        self._remember(key, token)
+        self._shared().set(self._shared_key(key), token, timeout=self.ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._stats["invalidations"] += 1
+        self._shared().delete(self._shared_key(key))
+
+    def invalidate_user(self, user_id, keys=()):
+        """
+        Drop every cached token of a user. The keys of the user's tokens
+        in the database are passed in so they leave the shared cache too.
+        """
+        with self._lock:
+            cached = [key for key, (token, expires) in self._entries.items()
+                      if token.user_id == user_id]
+        for key in set(cached) | set(keys):
+            self.invalidate(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = round(
+            (stats["hits"] + stats["shared_hits"]) / lookups, 4) \
+            if lookups else 0.0
+        return stats
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def cached_credentials(token):
+    if not token.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return CachedUser(token.user_id), token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in TokenAuthentication that skips the Token and User query for
+    tokens seen in the last TOKEN_CACHE_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return cached_credentials(token)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token)
+        return user, token
+
+
+async def aauthenticate(request):
+    """
+    TokenAuthentication for the async views, reads the token with the async
+    ORM on a token cache miss. Returns (user, token) or raises the same
+    AuthenticationFailed and NotAuthenticated errors as the sync path.
+    """
+    auth = get_authorization_header(request).split()
+    keyword = CachedTokenAuthentication.keyword
+    if not auth or auth[0].lower() != keyword.lower().encode():
+        raise exceptions.NotAuthenticated()
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. No credentials provided.'))
+    if len(auth) > 2:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. Token string should not contain spaces.'))
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. Token string should not contain invalid '
+              'characters.'))
+
+    token = token_cache.get(key)
+    if token is not None:
+        return cached_credentials(token)
+
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    token_cache.set(key, token)
+    return token.user, token
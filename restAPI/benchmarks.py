@@ -0,0 +1,146 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, fraction):
+    """
+    Nearest rank percentile of a sorted list, fraction between 0 and 1.
+    """
+    if not values:
+        return 0.0
+    # the tolerance keeps float noise such as 0.07 * 100 off the next rank
+    rank = max(1, math.ceil(fraction * len(values) - 1e-9))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(latencies, seconds):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(latencies) / seconds, 1)
+        if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def bench_sync(paths, token, concurrency):
+    """
+    Request every path through the WSGI handler from concurrency threads,
+    the way a threaded WSGI server serves them.
+    """
+    headers = {"HTTP_AUTHORIZATION": "Token {}".format(token)}
+
+    def fetch(path):
+        started = time.perf_counter()
+        response = Client().get(path, **headers)
+        assert response.status_code == 200, (path, response.status_code)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(fetch, paths))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_async(paths, token, concurrency):
+    """
+    Request every path through the ASGI handler from one event loop with
+    at most concurrency requests in flight.
+    """
+    # AsyncClient takes plain header names rather than WSGI environ keys
+    headers = {"Authorization": "Token {}".format(token)}
+
+    async def run():
+        client = AsyncClient()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def fetch(path):
+            async with limit:
+                started = time.perf_counter()
+                response = await client.get(path, **headers)
+                assert response.status_code == 200, \
+                    (path, response.status_code)
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(fetch(path) for path in paths))
+
+    started = time.perf_counter()
+    latencies = asyncio.run(run())
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def endpoint_requests(event_ids, event_dates, doomed_ids=()):
+    """
+    The request to time for every endpoint, as a function of the iteration
+    number returning (method, path, body, expected status). Writes use a
+    different event every iteration, destroy deletes one of doomed_ids,
+    events created for it, every iteration.
+    """
+    def event(iteration):
+        return event_ids[iteration % len(event_ids)]
+
+    def doomed(iteration):
+        return doomed_ids[iteration]
+
+    return {
+        "list": lambda i: ("get", "event/list/?page={}".format(
+            i % max(1, len(event_ids) // 10) + 1), None, 200),
+        "detail": lambda i: ("get", "event/{}/".format(event(i)), None, 200),
+        "results": lambda i: ("get", "event/{}/results/".format(event(i)),
+                              None, 200),
+        "most-votes": lambda i: ("get", "event/{}/most-votes/?top=3".format(
+            event(i)), None, 200),
+        "vote": lambda i: ("post", "event/{}/vote/".format(event(i)),
+                           {"name": "Benchmark voter {}".format(i),
+                            "votes": [str(event_dates[event(i)][0])]}, 201),
+        "create": lambda i: ("post", "event/",
+                             {"name": "Benchmark create {}".format(i),
+                              "dates": ["2024-06-01", "2024-06-02"]}, 200),
+        "update": lambda i: ("put", "event/{}/".format(event(i)),
+                             {"name": "Benchmark update {}".format(i),
+                              "dates": [str(date) for date
+                                        in event_dates[event(i)]]}, 200),
+        "destroy": lambda i: ("delete", "event/{}/".format(doomed(i)),
+                              None, 204),
+    }
+
+
+def bench_endpoints(client, requests, iterations):
+    """
+    Time every request of requests iterations times through client, one
+    after the other. Returns the latency percentiles and query counts per
+    endpoint.
+    """
+    report = dict()
+    for name, build in requests.items():
+        latencies = list()
+        queries = list()
+        started = time.perf_counter()
+        for iteration in range(iterations):
+            method, path, body, expected = build(iteration)
+            kwargs = dict(data=body, content_type="application/json") \
+                if body is not None else dict()
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = getattr(client, method)("/api/v1/" + path,
+                                                   **kwargs)
+                latencies.append(time.perf_counter() - request_started)
+            assert response.status_code == expected, \
+                (name, path, response.status_code)
+            queries.append(len(captured))
+        report[name] = summarize(latencies, time.perf_counter() - started)
+        queries.sort()
+        report[name]["queries"] = {
+            "p50": percentile(queries, 0.50),
+            "max": queries[-1] if queries else 0,
+        }
+    return report
@@ -0,0 +1,254 @@
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Event, EventDateData, VoteReceipt
+from .voting import ingest_ballots
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+
+# start of the UUID version 1 clock, 1582-10-15, in 100ns since the epoch
+UUID_EPOCH = 0x01b21dd213814000
+
+BufferedVote = namedtuple('BufferedVote', 'receipt event_id name date_ids')
+
+
+class VoteBufferFull(Exception):
+    pass
+
+
+def new_receipt():
+    # time based, so any process can tell how long ago it was issued,
+    # with a random node instead of the MAC address of the host
+    return uuid.uuid1(node=random.getrandbits(48) | (1 << 40))
+
+
+def receipt_age(receipt):
+    """
+    Seconds since the receipt was issued, None for receipts that do not
+    carry a time.
+    """
+    if receipt.version != 1:
+        return None
+    return time.time() - (receipt.time - UUID_EPOCH) / 10 ** 7
+
+
+class VoteBuffer:
+    """
+    In-process write-behind queue for validated votes. A background thread
+    commits the queued votes in one transaction per flush_size votes or
+    flush_interval seconds, whichever comes first, so many votes share one
+    fsync. The receipt of every vote is written in the same transaction.
+    """
+
+    def __init__(self, max_size, flush_size, flush_interval,
+                 pending_seconds):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending_seconds = pending_seconds
+        # tests flush by hand instead of racing the background thread
+        self.background = True
+        self._queue = queue.Queue()
+        self._pending = dict()
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, event_id, name, date_ids):
+        """
+        Queue the votes of one participant, returns the receipt id.
+        Raises VoteBufferFull when max_size votes are already waiting.
+        """
+        vote = BufferedVote(new_receipt(), event_id, name, tuple(date_ids))
+        with self._pending_lock:
+            # queued and in flight votes both count against max_size
+            if len(self._pending) >= self.max_size:
+                raise VoteBufferFull()
+            self._pending[vote.receipt] = event_id
+        self._queue.put(vote)
+        if self.background:
+            self._start()
+        return vote.receipt
+
+    def status(self, receipt):
+        """
+        The committed or failed VoteReceipt, PENDING while the receipt
+        waits in this process or, issued by another process, is younger
+        than pending_seconds, otherwise None.
+        """
+        with self._pending_lock:
+            if receipt in self._pending:
+                return PENDING
+        found = VoteReceipt.objects.filter(receipt=receipt).first()
+        if found is None:
+            age = receipt_age(receipt)
+            if age is not None and 0 <= age < self.pending_seconds:
+                return PENDING
+        return found
+
+    def size(self):
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            if self._thread is None:
+                # commit what is still queued when the worker shuts down
+                atexit.register(self.stop)
+            self._thread = threading.Thread(
+                target=self._run, name="vote-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """
+        Stop the background thread and commit whatever is still queued.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                # the thread outlives requests, treat a batch like one
+                close_old_connections()
+                with self._flush_lock:
+                    self._write(batch)
+                close_old_connections()
+
+    def _collect(self):
+        # block for the first vote, then gather more until the batch is
+        # full or the flush interval has passed
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """
+        Commit everything queued right now in the calling thread.
+        Returns the number of votes written.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = list()
+                while len(batch) < self.flush_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                self._write(batch)
+                written += len(batch)
+
+    def _write(self, batch):
+        try:
+            self._commit(batch)
+        except Exception as error:  # noqa
+            logger.exception("Vote buffer flush of %s votes failed", len(batch))
+            self._fail(batch, str(error))
+        finally:
+            with self._pending_lock:
+                for vote in batch:
+                    self._pending.pop(vote.receipt, None)
+
+    def _commit(self, batch):
+        event_ids = {vote.event_id for vote in batch}
+        events = Event.objects.in_bulk(event_ids)
+        receipts = list()
+        with transaction.atomic():
+            # dates may have been removed from their event since the votes
+            # were validated
+            linked = set(Event.dates.through.objects.filter(
+                event_id__in=event_ids).values_list(
+                'event_id', 'eventdatedata_id'))
+            for event_id in sorted(event_ids):
+                votes = [vote for vote in batch if vote.event_id == event_id]
+                event = events.get(event_id)
+                if event is None:
+                    receipts.extend(self._receipt(
+                        vote, VoteReceipt.FAILED, "Event does not exist")
+                        for vote in votes)
+                    continue
+
+                kept = list()
+                for vote in votes:
+                    vote = vote._replace(date_ids=tuple(
+                        date_id for date_id in vote.date_ids
+                        if (event_id, date_id) in linked))
+                    if vote.date_ids:
+                        kept.append(vote)
+                    else:
+                        receipts.append(self._receipt(
+                            vote, VoteReceipt.FAILED,
+                            "Voted dates were removed from the event"))
+                if kept:
+                    receipts.extend(self._commit_event(event, kept))
+            VoteReceipt.objects.bulk_create(receipts)
+
+    def _commit_event(self, event, votes):
+        # a failing event only rolls back its own savepoint, not the batch
+        ballots = dict()
+        for vote in votes:
+            ballots.setdefault(vote.name, set()).update(vote.date_ids)
+        try:
+            with transaction.atomic():
+                ingest_ballots(event, {
+                    name: [EventDateData(id=date_id) for date_id in date_ids]
+                    for name, date_ids in ballots.items()})
+        except Exception as error:  # noqa
+            logger.exception("Vote buffer flush of event %s failed", event.id)
+            return [self._receipt(vote, VoteReceipt.FAILED, str(error)[:255])
+                    for vote in votes]
+        return [self._receipt(vote, VoteReceipt.COMMITTED) for vote in votes]
+
+    def _fail(self, batch, detail):
+        VoteReceipt.objects.bulk_create(
+            [self._receipt(vote, VoteReceipt.FAILED, detail[:255])
+             for vote in batch],
+            ignore_conflicts=True)
+
+    @staticmethod
+    def _receipt(vote, status, detail=""):
+        # failed votes may belong to an event that is gone
+        return VoteReceipt(
+            receipt=vote.receipt, status=status, detail=detail,
+            event_id=vote.event_id if status == VoteReceipt.COMMITTED
+            else None,
+            votes=len(vote.date_ids))
+
+
+vote_buffer = VoteBuffer(settings.VOTE_BUFFER_MAX_SIZE,
+                         settings.VOTE_BUFFER_FLUSH_SIZE,
+                         settings.VOTE_BUFFER_FLUSH_INTERVAL_MS / 1000,
+                         settings.VOTE_BUFFER_PENDING_SECONDS)
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Event
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def event_cache():
+    return caches[settings.EVENT_CACHE_ALIAS]
+
+
+def event_updates(pk):
+    """
+    (id, updates) of the event with the primary key pk of the URL, None
+    when there is no such event. Every write to the event, its dates or
+    its votes bumps updates, in whichever process it happens.
+    """
+    try:
+        return Event.objects.filter(pk=pk).values_list(
+            "id", "updates").first()
+    except (TypeError, ValueError):
+        return None
+
+
+def response_key(event_id, updates, request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return "event:{}:{}:{}".format(
+        event_id, int(updates.timestamp() * 1000000), path)
+
+
+def cache_event_response(view_func):
+    """
+    Cache the successful responses of a detail view of EventViewSet per
+    event, request path and updates timestamp of the event, so a write
+    from any process leaves the cached responses behind. The event_updates
+    already loaded by conditional_event_response are passed in as event.
+    The key and the response are read from the same database, the replica
+    read_from_replicas chose for the request or the primary, so a lagging
+    replica never stores an old response under a newer key.
+    """
+    @wraps(view_func)
+    def wrapper(self, request, pk, *args, event=None, **kwargs):
+        if not settings.EVENT_CACHE_ENABLED:
+            return view_func(self, request, pk, *args, **kwargs)
+        if event is None:
+            event = event_updates(pk)
+        if event is None:
+            # not found, the view answers that
+            return view_func(self, request, pk, *args, **kwargs)
+
+        key = response_key(*event, request)
+        data = event_cache().get(key)
+        if data is not None:
+            _count("hits")
+            return Response(data, status=status.HTTP_200_OK,
+                            headers={"X-Cache": "HIT"})
+
+        _count("misses")
+        response = view_func(self, request, pk, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            event_cache().set(key, response.data)
+            response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
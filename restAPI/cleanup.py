@@ -0,0 +1,49 @@
+import time
+
+from django.db import transaction
+
+from .models import Event, EventDateData
+from .utils import chunked
+
+
+def delete_events(event_ids, chunk_size=500):
+    """
+    Delete events together with their people, votes, tallies and dates
+    with a few set-based statements in one transaction.
+    Dates that are still linked to another event are kept.
+    Returns the number of deleted events.
+    """
+    event_ids = list(event_ids)
+    through = Event.dates.through
+    with transaction.atomic():
+        date_ids = list(through.objects.filter(
+            event_id__in=event_ids).values_list('eventdatedata_id', flat=True))
+        # cascades to the people, votes, tallies and M2M rows of the events
+        deleted, per_model = Event.objects.filter(id__in=event_ids).delete()
+        for chunk in chunked(date_ids, chunk_size):
+            EventDateData.objects.filter(
+                id__in=chunk, event_dates__isnull=True).delete()
+    return per_model.get(Event._meta.label, 0)
+
+
+def orphan_dates():
+    return EventDateData.objects.filter(event_dates__isnull=True)
+
+
+def delete_orphan_dates(batch_size=500, pause=0.0):
+    """
+    Delete the dates that no event links to anymore, one short transaction
+    per batch so writers are not locked out for long. pause is the number
+    of seconds to sleep between batches.
+    Yields the number of dates deleted by each batch.
+    """
+    while True:
+        ids = list(orphan_dates().order_by('id').values_list(
+            'id', flat=True)[:batch_size])
+        if not ids:
+            return
+        with transaction.atomic():
+            deleted, per_model = orphan_dates().filter(id__in=ids).delete()
+        yield per_model.get(EventDateData._meta.label, 0)
+        if pause:
+            time.sleep(pause)
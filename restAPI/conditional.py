@@ -0,0 +1,59 @@
+import hashlib
+from functools import wraps
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, \
+    quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import event_updates
+
+
+def make_etag(event_id, updates, request):
+    # the query string changes the payload, so it is part of the tag
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()[:12]
+    return quote_etag("{}-{}-{}".format(
+        event_id, int(updates.timestamp() * 1000000), path))
+
+
+def not_modified(request, etag, updates):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return "*" in etags or etag in etags or "W/" + etag in etags
+
+    if_modified_since = parse_http_date_safe(
+        request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return if_modified_since is not None and \
+        int(updates.timestamp()) <= if_modified_since
+
+
+def conditional_event_response(view_func):
+    """
+    Answer conditional GETs of a detail view of EventViewSet from the
+    updates timestamp of the event, which every write to the event, its
+    dates or its votes bumps. A matching If-None-Match or If-Modified-Since
+    gets a 304 before the view runs. Wraps cache_event_response, which gets
+    the loaded timestamp so cached bodies always match their ETag.
+    """
+    @wraps(view_func)
+    def wrapper(self, request, pk, *args, **kwargs):
+        event = event_updates(pk)
+        if event is None:
+            return view_func(self, request, pk, *args, **kwargs)
+
+        event_id, updates = event
+        etag = make_etag(event_id, updates, request)
+        headers = {"ETag": etag,
+                   "Last-Modified": http_date(updates.timestamp())}
+        if not_modified(request, etag, updates):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+
+        response = view_func(self, request, pk, *args, event=event, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    return wrapper
@@ -0,0 +1,29 @@
+import sqlite3
+from contextlib import closing
+
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(connection):
+    """
+    Run the SQLITE_PRAGMAS settings on a freshly opened SQLite connection.
+    journal_mode=WAL is stored in the database file, the others only last
+    as long as the connection, which CONN_MAX_AGE keeps open.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute("PRAGMA {} = {}".format(pragma, value))
+
+
+def copy_sqlite_database(source, target, pages=1024):
+    """
+    Copy the SQLite database file source over target with the online backup
+    API, which gives a consistent snapshot while the source takes writes and
+    lets connections already open on target see the new rows. pages is the
+    number of pages copied per step, the source is not locked in between.
+    """
+    with closing(sqlite3.connect(source)) as source_db, \
+            closing(sqlite3.connect(target)) as target_db:
+        source_db.backup(target_db, pages=pages)
@@ -0,0 +1,92 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Event, Votes
+
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_COLUMNS = ('event_id', 'event_name', 'event_updates', 'date', 'voter')
+
+
+def parse_since(value):
+    """
+    Parse the since timestamp of an incremental export, naive timestamps
+    are taken to be in the current time zone. Raises ValueError.
+    """
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError("since must be an ISO 8601 timestamp")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def iter_events(since=None, chunk_size=500):
+    """
+    Yield every event with its dates and votes, oldest first. Events are
+    fetched chunk_size at a time, each chunk prefetches the dates and votes
+    of its events, so memory use does not grow with the table size.
+    """
+    events = Event.objects.order_by('id').prefetch_related(
+        'dates',
+        Prefetch('votes_set', queryset=Votes.objects.select_related(
+            'user', 'date_voted').order_by('id')))
+    if since is not None:
+        events = events.filter(updates__gte=since)
+
+    for event in events.iterator(chunk_size=chunk_size):
+        yield {
+            "id": event.id,
+            "name": event.name,
+            "created": event.created,
+            "updates": event.updates,
+            "dates": [data.date_suggestion for data in event.dates.all()],
+            "votes": [{"date": vote.date_voted.date_suggestion,
+                       "name": vote.user.name}
+                      for vote in event.votes_set.all()],
+        }
+
+
+def ndjson_lines(events):
+    for event in events:
+        yield json.dumps(event, cls=DjangoJSONEncoder) + "\n"
+
+
+class _Line:
+    # csv.writer only writes to file like objects, hand the row back instead
+    def write(self, value):
+        return value
+
+
+def csv_lines(events):
+    """
+    One row per event date and voter, dates nobody voted for get one row
+    without a voter.
+    """
+    writer = csv.writer(_Line())
+    yield writer.writerow(CSV_COLUMNS)
+    for event in events:
+        voters = dict()
+        for vote in event["votes"]:
+            voters.setdefault(vote["date"], []).append(vote["name"])
+        updates = event["updates"].isoformat()
+        for date in event["dates"]:
+            for voter in voters.get(date) or [""]:
+                yield writer.writerow(
+                    (event["id"], event["name"], updates, date.isoformat(),
+                     voter))
+
+
+def export_lines(fmt, since=None, chunk_size=500):
+    events = iter_events(since=since, chunk_size=chunk_size)
+    if fmt == 'csv':
+        return csv_lines(events)
+    return ndjson_lines(events)
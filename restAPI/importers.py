@@ -0,0 +1,134 @@
+import csv
+import json
+import time
+from datetime import datetime
+
+from django.db import transaction
+
+from eventschedulingAPI import settings
+from .models import Event, EventDateData
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+# separator of the dates inside the dates column of a csv import
+CSV_DATE_SEPARATOR = ';'
+
+
+class EventImportError(ValueError):
+
+    def __init__(self, record_number, message):
+        self.record_number = record_number
+        super().__init__("record {}: {}".format(record_number, message))
+
+
+def read_records(lines, fmt):
+    """
+    Turn an iterable of text lines into (name, dates) records.
+    ndjson and csv are read line by line, json expects a list of events.
+    """
+    if fmt == 'ndjson':
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == 'csv':
+        for row in csv.DictReader(lines):
+            dates = row.get('dates') or ''
+            yield {"name": row.get('name'),
+                   "dates": [date.strip() for date
+                             in dates.split(CSV_DATE_SEPARATOR) if date.strip()]}
+    elif fmt == 'json':
+        yield from json.loads(''.join(lines))
+    else:
+        raise ValueError("Unknown import format {}".format(fmt))
+
+
+def clean_record(record_number, record):
+    if not isinstance(record, dict):
+        raise EventImportError(record_number, "Expected an object")
+    name = record.get('name')
+    dates = record.get('dates')
+    if name is not None and not isinstance(name, str):
+        raise EventImportError(record_number, "Name must be a string")
+    if not name or len(name) > 255:
+        raise EventImportError(record_number,
+                               "Name cannot be blank or longer than 255")
+    if not dates or not isinstance(dates, list):
+        raise EventImportError(
+            record_number,
+            "Dates cannot be blank or is not a list of dates: [<date>, <date>]")
+    try:
+        dates = [datetime.strptime(str(date),
+                                   settings.DATE_INPUT_FORMATS[0]).date()
+                 for date in dates]
+    except ValueError:
+        raise EventImportError(record_number,
+                               "Incorrect date format, should be YYYY-MM-DD")
+    return name, dates
+
+
+def create_events(records):
+    """
+    Create a chunk of (name, dates) records with one bulk insert each for
+    the events, the dates and the M2M through rows.
+    Returns the number of rows written.
+    """
+    events = Event.objects.bulk_create([Event(name=name)
+                                        for name, dates in records])
+    event_dates = EventDateData.objects.bulk_create([
+        EventDateData(date_suggestion=date)
+        for name, dates in records for date in dates])
+
+    through = Event.dates.through
+    links = list()
+    position = 0
+    for event, (name, dates) in zip(events, records):
+        for event_date in event_dates[position:position + len(dates)]:
+            links.append(through(event_id=event.id,
+                                 eventdatedata_id=event_date.id))
+        position += len(dates)
+    through.objects.bulk_create(links)
+
+    return len(events) + len(event_dates) + len(links)
+
+
+def import_events(records, chunk_size=1000, skip=0, on_chunk=None):
+    """
+    Import an iterable of event records in chunks of chunk_size, each chunk
+    in its own transaction. The first skip records are only validated, so
+    an interrupted import can resume. on_chunk is called with the number of
+    records committed so far after every chunk.
+    Returns the counts and the throughput of the import.
+    """
+    started = time.monotonic()
+    imported = 0
+    rows = 0
+    committed = skip
+    chunk = list()
+
+    def flush():
+        nonlocal imported, rows, committed
+        with transaction.atomic():
+            rows += create_events(chunk)
+        imported += len(chunk)
+        committed += len(chunk)
+        chunk.clear()
+        if on_chunk:
+            on_chunk(committed)
+
+    for record_number, record in enumerate(records, start=1):
+        cleaned = clean_record(record_number, record)
+        if record_number <= skip:
+            continue
+        chunk.append(cleaned)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    seconds = time.monotonic() - started
+    return {
+        "events": imported,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds else rows,
+    }
@@ -0,0 +1,49 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI.profiling import profiles_by_route, top_functions
+
+
+class Command(BaseCommand):
+    help = "Merge the sampled request profiles and show the most " \
+           "expensive functions per route"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="Defaults to PROFILING_DIR")
+        parser.add_argument("--route", action="append",
+                            help="Only this route (view name), can be "
+                                 "repeated")
+        parser.add_argument("--sort", choices=("cumulative", "tottime"),
+                            default="cumulative")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        routes = profiles_by_route(options["dir"] or settings.PROFILING_DIR)
+        if options["route"]:
+            routes = {route: paths for route, paths in routes.items()
+                      if route in options["route"]}
+        if not routes:
+            raise CommandError("No profiles found")
+
+        report = {route: {"samples": len(paths),
+                          "functions": top_functions(
+                              paths, sort=options["sort"],
+                              limit=options["limit"])}
+                  for route, paths in sorted(routes.items())}
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for route, summary in report.items():
+            self.stdout.write("{} ({} samples)".format(route,
+                                                       summary["samples"]))
+            self.stdout.write("{:>10} {:>10} {:>10} {:>12}  {}".format(
+                "calls", "tottime", "cumtime", "cum/sample", "function"))
+            for row in summary["functions"]:
+                self.stdout.write(
+                    "{calls:>10} {tottime:>10.4f} {cumtime:>10.4f} "
+                    "{cumtime_per_sample:>12.4f}  {function}".format(**row))
+            self.stdout.write("")
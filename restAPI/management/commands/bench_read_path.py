@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from restAPI.benchmarks import bench_async, bench_sync
+from restAPI.models import Event
+
+ENDPOINTS = {
+    "list": "event/list/",
+    "retrieve": "event/{}/",
+    "results": "event/{}/results/",
+    "most-votes": "event/{}/most-votes/",
+}
+
+
+class Command(BaseCommand):
+    help = "Compare the sync (WSGI) and async (ASGI) read endpoints " \
+           "under concurrent requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event_id", type=int,
+                            help="Defaults to the first event")
+        parser.add_argument("--token", help="Defaults to the first token")
+        parser.add_argument("--endpoint", choices=ENDPOINTS, action="append",
+                            help="Can be repeated, defaults to all")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+
+    def handle(self, *args, **options):
+        event_id = options["event_id"] or Event.objects.order_by(
+            "id").values_list("id", flat=True).first()
+        if event_id is None:
+            raise CommandError("No events to read, seed some first")
+        token = options["token"] or Token.objects.values_list(
+            "key", flat=True).first()
+        if token is None:
+            raise CommandError("No token, create one with create_token")
+
+        report = dict()
+        # measure the views themselves, not the response cache
+        with override_settings(EVENT_CACHE_ENABLED=False):
+            for endpoint in options["endpoint"] or ENDPOINTS:
+                path = ENDPOINTS[endpoint].format(event_id)
+                report[endpoint] = {
+                    "wsgi": bench_sync(
+                        ["/api/v1/" + path] * options["requests"],
+                        token, options["concurrency"]),
+                    "asgi": bench_async(
+                        ["/api/v1/async/" + path] * options["requests"],
+                        token, options["concurrency"]),
+                }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -1,7 +1,12 @@
 from rest_framework.authtoken.models import Token
 
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.management.base import BaseCommand
 
+from restAPI.authentication import token_cache
+
 
 class Command(BaseCommand):
 
@@ -11,5 +16,10 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         user = options["user_id"]
         token = Token.objects.create(user_id=user)
+        # the server only sees the warmed token through a shared cache,
+        # an in-memory one ends with this process
+        if not isinstance(caches[settings.TOKEN_CACHE_ALIAS], LocMemCache):
+            token_cache.set(token.key, Token.objects.select_related(
+                "user").get(key=token.key))
         print("HERE IS YOUR TOKEN:", token.key)
 
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI.exporters import FORMATS, export_lines, parse_since
+
+
+class Command(BaseCommand):
+    help = "Export events with their dates and votes as ndjson or csv"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", choices=FORMATS, default="ndjson")
+        parser.add_argument("--since",
+                            help="Only events updated at or after this "
+                                 "ISO 8601 timestamp")
+        parser.add_argument("--file", help="Defaults to stdout")
+        parser.add_argument("--chunk_size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        if since:
+            try:
+                since = parse_since(since)
+            except ValueError as error:
+                raise CommandError(error)
+
+        lines = export_lines(options["output"], since=since,
+                             chunk_size=options["chunk_size"])
+        if options["file"]:
+            with open(options["file"], "w", newline="",
+                      encoding="utf-8") as export_file:
+                export_file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from restAPI.cleanup import delete_orphan_dates, orphan_dates
+
+
+class Command(BaseCommand):
+    help = "Delete event dates that are not linked to any event"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=500)
+        parser.add_argument("--pause", type=float, default=0.05,
+                            help="Seconds to wait between batches")
+        parser.add_argument("--dry_run", action="store_true",
+                            help="Only count the orphaned dates")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            self.stdout.write(
+                "{} orphaned dates".format(orphan_dates().count()))
+            return
+
+        total = 0
+        for deleted in delete_orphan_dates(options["batch_size"],
+                                           options["pause"]):
+            total += deleted
+            self.stdout.write("Deleted {} orphaned dates".format(total))
+        self.stdout.write("Done, deleted {} orphaned dates".format(total))
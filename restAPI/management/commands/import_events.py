@@ -0,0 +1,55 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI.importers import FORMATS, import_events, read_records
+
+
+class Command(BaseCommand):
+    help = "Bulk import events from a json, ndjson or csv file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Defaults to the file extension")
+        parser.add_argument("--chunk_size", type=int, default=1000)
+        parser.add_argument("--checkpoint",
+                            help="File to record progress in, an interrupted "
+                                 "import resumes from it "
+                                 "(default: <path>.checkpoint)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or os.path.splitext(path)[1].lstrip(".")
+        if fmt not in FORMATS:
+            raise CommandError("Unknown format {}, use --format".format(fmt))
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk_size must be a positive integer")
+        checkpoint = options["checkpoint"] or path + ".checkpoint"
+
+        skip = 0
+        if os.path.exists(checkpoint):
+            with open(checkpoint) as checkpoint_file:
+                skip = int(checkpoint_file.read().strip() or 0)
+            self.stdout.write("Resuming after {} records".format(skip))
+
+        def save_checkpoint(committed):
+            with open(checkpoint, "w") as checkpoint_file:
+                checkpoint_file.write(str(committed))
+
+        with open(path, newline="", encoding="utf-8") as import_file:
+            try:
+                summary = import_events(
+                    read_records(import_file, fmt),
+                    chunk_size=options["chunk_size"], skip=skip,
+                    on_chunk=save_checkpoint)
+            except ValueError as error:
+                raise CommandError(
+                    "{}, rerun to resume from the last checkpoint".format(
+                        error))
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            "Imported {events} events ({rows} rows) in {seconds}s, "
+            "{rows_per_second} rows/s".format(**summary))
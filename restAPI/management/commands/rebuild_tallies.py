@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI.tallies import find_drift, rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the vote tallies from the raw votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event_id", type=int, action="append",
+                            help="Limit to this event, can be repeated")
+        parser.add_argument("--verify", action="store_true",
+                            help="Only report drift, exit non-zero if found")
+
+    def handle(self, *args, **options):
+        event_ids = options["event_id"]
+
+        if options["verify"]:
+            drift = find_drift(event_ids)
+            for (event_id, date_id), stored, expected in drift:
+                self.stdout.write(
+                    "event {} date {}: stored {} expected {}".format(
+                        event_id, date_id, stored, expected))
+            if drift:
+                raise CommandError(
+                    "{} tallies have drifted".format(len(drift)))
+            self.stdout.write("Tallies are up to date")
+            return
+
+        written = rebuild_tallies(event_ids)
+        self.stdout.write("Rebuilt {} tallies".format(written))
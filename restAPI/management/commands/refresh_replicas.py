@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI.database import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database over the read replicas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Keep refreshing every this many seconds")
+        parser.add_argument("--pages", type=int, default=1024,
+                            help="Pages copied per backup step")
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError("No replicas configured, set DATABASE_REPLICAS")
+        source = settings.DATABASES['default']['NAME']
+
+        while True:
+            started = time.monotonic()
+            for alias in settings.REPLICA_DATABASES:
+                copy_sqlite_database(source, settings.DATABASES[alias]['NAME'],
+                                     pages=options["pages"])
+            self.stdout.write("Refreshed {} replicas in {:.3f}s".format(
+                len(settings.REPLICA_DATABASES), time.monotonic() - started))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
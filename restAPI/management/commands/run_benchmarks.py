@@ -0,0 +1,122 @@
+import json
+import platform
+from datetime import date
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from restAPI.benchmarks import bench_endpoints, endpoint_requests
+from restAPI.cleanup import delete_events
+from restAPI.importers import create_events
+from restAPI.models import Event, People
+
+ENDPOINTS = ("list", "detail", "results", "most-votes", "vote", "create",
+             "update", "destroy")
+
+# names of the rows the benchmark writes, removed again afterwards
+CREATED_PREFIX = "Benchmark create "
+DOOMED_PREFIX = "Benchmark doomed "
+UPDATED_PREFIX = "Benchmark update "
+VOTER_PREFIX = "Benchmark voter "
+USER_NAME = "run_benchmarks"
+
+
+class Command(BaseCommand):
+    help = "Time every endpoint through the test client and print the " \
+           "latency percentiles and query counts as JSON. Every request " \
+           "commits like in production, the rows the benchmark writes are " \
+           "removed afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--endpoint", choices=ENDPOINTS, action="append",
+                            help="Can be repeated, defaults to all")
+        parser.add_argument("--events", type=int, default=1000,
+                            help="Spread the requests over this many events")
+        parser.add_argument("--label", default="",
+                            help="Stored in the report, e.g. a commit hash")
+        parser.add_argument("--output", help="Write the report to this file")
+        parser.add_argument("--cache", action="store_true",
+                            help="Keep the response cache on")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be a positive integer")
+        endpoints = options["endpoint"] or ENDPOINTS
+
+        event_names = dict(Event.objects.order_by("id").values_list(
+            "id", "name")[:options["events"]])
+        if not event_names:
+            raise CommandError("No events, run seed_benchmark_data first")
+        event_ids = list(event_names)
+        event_dates = dict()
+        for event_id, date_suggestion in Event.dates.through.objects.filter(
+                event_id__in=event_ids).order_by(
+                "eventdatedata__date_suggestion").values_list(
+                "event_id", "eventdatedata__date_suggestion"):
+            event_dates.setdefault(event_id, []).append(date_suggestion)
+
+        with override_settings(EVENT_CACHE_ENABLED=options["cache"],
+                               VOTE_BUFFER_ENABLED=False):
+            try:
+                # destroy deletes events of its own, one per iteration
+                doomed_ids = self.create_doomed(options["iterations"]) \
+                    if "destroy" in endpoints else []
+                user, created = get_user_model().objects.get_or_create(
+                    username=USER_NAME)
+                token, created = Token.objects.get_or_create(user=user)
+                client = Client(
+                    HTTP_AUTHORIZATION="Token {}".format(token.key))
+
+                requests = endpoint_requests(event_ids, event_dates,
+                                             doomed_ids)
+                report = {
+                    "label": options["label"],
+                    "database": connection.vendor,
+                    "django": django.get_version(),
+                    "python": platform.python_version(),
+                    "events": len(event_ids),
+                    "iterations": options["iterations"],
+                    "endpoints": bench_endpoints(
+                        client, {name: requests[name] for name in endpoints},
+                        options["iterations"]),
+                }
+            finally:
+                self.clean_up(event_names)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+        self.stdout.write(output)
+
+    @staticmethod
+    def create_doomed(count):
+        with transaction.atomic():
+            create_events([("{}{}".format(DOOMED_PREFIX, number),
+                            [date(2024, 6, 1), date(2024, 6, 2)])
+                           for number in range(count)])
+        return list(Event.objects.filter(
+            name__startswith=DOOMED_PREFIX).order_by("id").values_list(
+            "id", flat=True))
+
+    @staticmethod
+    def clean_up(event_names):
+        with transaction.atomic():
+            delete_events(Event.objects.filter(
+                name__startswith=CREATED_PREFIX).values_list("id", flat=True))
+            delete_events(Event.objects.filter(
+                name__startswith=DOOMED_PREFIX).values_list("id", flat=True))
+            # recounts the tallies of the voted dates
+            People.objects.filter(name__startswith=VOTER_PREFIX).delete()
+            renamed = Event.objects.filter(
+                id__in=event_names, name__startswith=UPDATED_PREFIX).in_bulk()
+            for event in renamed.values():
+                event.name = event_names[event.id]
+            Event.objects.bulk_update(renamed.values(), ["name"])
+            get_user_model().objects.filter(username=USER_NAME).delete()
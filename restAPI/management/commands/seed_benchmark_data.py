@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restAPI.seeding import seed_events
+
+
+class Command(BaseCommand):
+    help = "Generate a large deterministic dataset for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=1000)
+        parser.add_argument("--dates", type=int, default=10,
+                            help="Dates per event")
+        parser.add_argument("--people", type=int, default=20,
+                            help="Participants per event")
+        parser.add_argument("--votes", type=int, default=5,
+                            help="Votes per participant")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk_size", type=int, default=200,
+                            help="Events per transaction")
+
+    def handle(self, *args, **options):
+        for option in ("events", "dates", "chunk_size"):
+            if options[option] < 1:
+                raise CommandError(
+                    "--{} must be a positive integer".format(option))
+        try:
+            written = seed_events(
+                options["events"], options["dates"], options["people"],
+                options["votes"], seed=options["seed"],
+                chunk_size=options["chunk_size"])
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            "Seeded {events} events, {dates} dates, {people} people and "
+            "{votes} votes in {seconds}s".format(**written))
@@ -0,0 +1,194 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+# Per request timings, only set while RequestMetricsMiddleware runs
+_current = ContextVar("request_timings", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                    10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestTimings:
+    __slots__ = ("queries", "db_seconds", "serializer_seconds",
+                 "serializer_depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook, times every query of the request
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install_query_timer(connection):
+    """
+    Add record_query to the execute wrappers of a connection, once. It
+    reads the timings from the context, so the queries the async ORM runs
+    on its worker threads are counted for the request that awaits them.
+    """
+    if record_query not in connection.execute_wrappers:
+        # first, connection.execute_wrapper() blocks pop the last one
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def measure_request():
+    """
+    Count the queries and time the database and serializer work done in
+    the block on every configured database. Yields the RequestTimings.
+    """
+    for connection in connections.all():
+        install_query_timer(connection)
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent in to_representation to the serializer time of the
+    current request. Nested serializers are only counted once.
+    """
+
+    def to_representation(self, instance):
+        timings = _current.get()
+        if timings is None:
+            return super().to_representation(instance)
+        timings.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializer_depth -= 1
+            if not timings.serializer_depth:
+                timings.serializer_seconds += time.perf_counter() - started
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf", ), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """
+    In-memory per route request histograms of this process.
+    """
+
+    histograms = (
+        ("request_duration_seconds", "Time spent in the view", DURATION_BUCKETS),
+        ("request_db_seconds", "Time spent in database queries",
+         DURATION_BUCKETS),
+        ("request_serializer_seconds", "Time spent serializing responses",
+         DURATION_BUCKETS),
+        ("request_queries", "Database queries per request", QUERY_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._requests = dict()
+            self._histograms = {name: dict() for name, _, _
+                                in self.histograms}
+
+    def observe(self, route, method, status_code, view_seconds, timings):
+        values = {
+            "request_duration_seconds": view_seconds,
+            "request_db_seconds": timings.db_seconds,
+            "request_serializer_seconds": timings.serializer_seconds,
+            "request_queries": timings.queries,
+        }
+        labels = (route, method)
+        with self._lock:
+            key = (route, method, status_code)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            for name, _, buckets in self.histograms:
+                histogram = self._histograms[name].get(labels)
+                if histogram is None:
+                    histogram = self._histograms[name][labels] = \
+                        Histogram(buckets)
+                histogram.observe(values[name])
+
+    def render(self, prefix="eventscheduling_"):
+        lines = list()
+        with self._lock:
+            name = prefix + "requests_total"
+            lines += ["# HELP {} Requests served".format(name),
+                      "# TYPE {} counter".format(name)]
+            for (route, method, code), count in sorted(self._requests.items()):
+                lines.append('{}{{route="{}",method="{}",status="{}"}} {}'.format(
+                    name, route, method, code, count))
+
+            for suffix, description, _ in self.histograms:
+                name = prefix + suffix
+                lines += ["# HELP {} {}".format(name, description),
+                          "# TYPE {} histogram".format(name)]
+                for (route, method), histogram in sorted(
+                        self._histograms[suffix].items()):
+                    labels = 'route="{}",method="{}"'.format(route, method)
+                    for bound, count in histogram.cumulative():
+                        lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                            name, labels, bound, count))
+                    lines.append("{}_sum{{{}}} {}".format(
+                        name, labels, round(histogram.sum, 6)))
+                    lines.append("{}_count{{{}}} {}".format(
+                        name, labels, histogram.count))
+        return lines
+
+
+def render_stats(name, stats, description, prefix="eventscheduling_"):
+    """
+    Render a dict of counters such as cache_stats() as gauges labelled
+    with the counter name.
+    """
+    name = prefix + name
+    lines = ["# HELP {} {}".format(name, description),
+             "# TYPE {} gauge".format(name)]
+    for stat, value in sorted(stats.items()):
+        lines.append('{}{{stat="{}"}} {}'.format(name, stat, value))
+    return lines
+
+
+request_metrics = RequestMetrics()
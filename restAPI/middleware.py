@@ -0,0 +1,209 @@
+import cProfile
+import hashlib
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, \
+    sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+
+from .authentication import CachedTokenAuthentication
+from .metrics import measure_request, request_metrics
+from .profiling import save_profile
+from .routers import read_from_replicas
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def client_key(request):
+    """
+    Identify the client by its credentials, falling back to its address
+    for anonymous requests.
+    """
+    credentials = request.META.get("HTTP_AUTHORIZATION") \
+        or request.META.get("REMOTE_ADDR", "")
+    return "wrote:{}".format(
+        hashlib.sha256(credentials.encode()).hexdigest())
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Base of the middlewares below. Under ASGI the handler chain is async,
+    then __acall__ runs instead of __call__ so requests to the async views
+    never go through the sync bridge.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class ReadYourWritesMiddleware(SyncAndAsyncMiddleware):
+    """
+    Let safe requests read from the replicas, unless the same client sent
+    a write in the last READ_YOUR_WRITES_WINDOW seconds, then it reads from
+    the primary until the replicas are likely to have caught up.
+    """
+
+    def handle(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        cache = caches[settings.REPLICATION_CACHE_ALIAS]
+        key = client_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                cache.set(key, True, timeout=settings.READ_YOUR_WRITES_WINDOW)
+            return response
+
+        with read_from_replicas(not cache.get(key)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return await self.get_response(request)
+
+        cache = caches[settings.REPLICATION_CACHE_ALIAS]
+        key = client_key(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if response.status_code < 400:
+                await cache.aset(key, True,
+                                 timeout=settings.READ_YOUR_WRITES_WINDOW)
+            return response
+
+        # the async ORM threads inherit the context, and with it the choice
+        with read_from_replicas(not await cache.aget(key)):
+            return await self.get_response(request)
+
+
+class RequestMetricsMiddleware(SyncAndAsyncMiddleware):
+    """
+    Time every request and count its queries into the per route histograms
+    of request_metrics, and report them in a Server-Timing header. Keep it
+    last in MIDDLEWARE so the view time is the view and its rendering.
+    """
+
+    def handle(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        with measure_request() as timings:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            view_seconds = time.perf_counter() - started
+        return self.report(request, response, timings, view_seconds)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        with measure_request() as timings:
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            view_seconds = time.perf_counter() - started
+        return self.report(request, response, timings, view_seconds)
+
+    @staticmethod
+    def report(request, response, timings, view_seconds):
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        request_metrics.observe(route, request.method, response.status_code,
+                                view_seconds, timings)
+        response["Server-Timing"] = \
+            'db;dur={:.2f};desc="{} queries", serializer;dur={:.2f}, ' \
+            'view;dur={:.2f}'.format(timings.db_seconds * 1000,
+                                     timings.queries,
+                                     timings.serializer_seconds * 1000,
+                                     view_seconds * 1000)
+        return response
+
+
+class SamplingProfilerMiddleware(SyncAndAsyncMiddleware):
+    """
+    Run cProfile on PROFILING_SAMPLE_RATE of the requests, and on requests
+    of staff tokens that send the PROFILING_HEADER header. The profiles are
+    written to PROFILING_DIR, which is kept under PROFILING_MAX_BYTES by
+    deleting the oldest ones. aggregate_profiles summarizes them per route.
+    Under ASGI the profile covers the event loop thread while the request
+    runs, which includes other requests served in the meantime.
+    """
+
+    def handle(self, request):
+        if not (self.sampled() or self.staff_asks_for_profile(request)):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.save(request, response, profiler)
+
+    async def __acall__(self, request):
+        if not self.sampled() and not (
+                self.asks_for_profile(request) and
+                await sync_to_async(self.staff_asks_for_profile)(request)):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.save(request, response, profiler)
+
+    @staticmethod
+    def save(request, response, profiler):
+        match = request.resolver_match
+        name = save_profile(profiler, settings.PROFILING_DIR,
+                            match.view_name if match else "unmatched",
+                            settings.PROFILING_MAX_BYTES)
+        response["X-Profile"] = name
+        return response
+
+    @staticmethod
+    def sampled():
+        return bool(settings.PROFILING_SAMPLE_RATE) and \
+            random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @staticmethod
+    def asks_for_profile(request):
+        return bool(settings.PROFILING_HEADER) and \
+            settings.PROFILING_HEADER in request.headers
+
+    @classmethod
+    def staff_asks_for_profile(cls, request):
+        # the token lookup may query the database
+        if not cls.asks_for_profile(request):
+            return False
+        auth = request.headers.get("Authorization", "").split()
+        if len(auth) != 2 or auth[0] != CachedTokenAuthentication.keyword:
+            return False
+        try:
+            user, token = CachedTokenAuthentication().authenticate_credentials(
+                auth[1])
+        except exceptions.AuthenticationFailed:
+            return False
+        return user.is_staff
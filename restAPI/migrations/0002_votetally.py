@@ -0,0 +1,54 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:54
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_tallies(apps, schema_editor):
+    # results and most-votes only read the tallies of the existing votes
+    People = apps.get_model('restAPI', 'People')
+    Votes = apps.get_model('restAPI', 'Votes')
+    VoteTally = apps.get_model('restAPI', 'VoteTally')
+
+    participants = dict(People.objects.order_by().values('event').annotate(
+        count=Count('id')).values_list('event', 'count'))
+    rows = Votes.objects.order_by().values('event', 'date_voted').annotate(
+        count=Count('id')).values_list('event', 'date_voted', 'count')
+    VoteTally.objects.all().delete()
+    VoteTally.objects.bulk_create([
+        VoteTally(event_id=event_id, date_id=date_id, vote_count=count,
+                  participant_count=participants.get(event_id, 0))
+        for event_id, date_id, count in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updates', models.DateTimeField(auto_now=True)),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+                ('participant_count', models.PositiveIntegerField(default=0)),
+                ('date', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restAPI.eventdatedata')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restAPI.event')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='votetally',
+            index=models.Index(fields=['event', '-vote_count'], name='votetally_event_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='votetally',
+            constraint=models.UniqueConstraint(fields=('event', 'date'), name='unique_event_date_tally'),
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.1.7 on 2026-10-18 08:56
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tallies(apps, schema_editor):
+    People = apps.get_model('restAPI', 'People')
+    Votes = apps.get_model('restAPI', 'Votes')
+    VoteTally = apps.get_model('restAPI', 'VoteTally')
+
+    participants = dict(People.objects.order_by().values('event').annotate(
+        count=Count('id')).values_list('event', 'count'))
+    rows = Votes.objects.order_by().values('event', 'date_voted').annotate(
+        count=Count('id')).values_list('event', 'date_voted', 'count')
+    VoteTally.objects.all().delete()
+    VoteTally.objects.bulk_create([
+        VoteTally(event_id=event_id, date_id=date_id, vote_count=count,
+                  participant_count=participants.get(event_id, 0))
+        for event_id, date_id, count in rows
+    ])
+
+
+def merge_duplicates(apps, schema_editor):
+    People = apps.get_model('restAPI', 'People')
+    Votes = apps.get_model('restAPI', 'Votes')
+
+    # keep the first person per (event, name) and move the votes over
+    kept = dict()
+    for people in People.objects.order_by('id'):
+        key = (people.event_id, people.name)
+        if key in kept:
+            Votes.objects.filter(user=people).update(user_id=kept[key])
+            people.delete()
+        else:
+            kept[key] = people.id
+
+    # drop repeated votes of the same person for the same date
+    seen = set()
+    for vote in Votes.objects.order_by('id'):
+        key = (vote.user_id, vote.event_id, vote.date_voted_id)
+        if key in seen:
+            vote.delete()
+        else:
+            seen.add(key)
+
+    # the merged people and dropped votes changed the counts
+    backfill_tallies(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0002_votetally'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='people',
+            constraint=models.UniqueConstraint(fields=('event', 'name'), name='unique_event_people_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='votes',
+            constraint=models.UniqueConstraint(fields=('user', 'event', 'date_voted'), name='unique_user_event_date_vote'),
+        ),
+    ]
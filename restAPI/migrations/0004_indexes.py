@@ -0,0 +1,29 @@
+# Generated by Django 4.1.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0003_unique_people_votes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['name'], name='event_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventdatedata',
+            index=models.Index(fields=['date_suggestion'], name='eventdate_suggestion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votes',
+            index=models.Index(fields=['event', 'date_voted'], name='votes_event_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votes',
+            index=models.Index(fields=['event', 'user'], name='votes_event_user_idx'),
+        ),
+    ]
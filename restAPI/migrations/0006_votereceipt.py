@@ -0,0 +1,30 @@
+# Generated by Django 4.1.7 on 2026-10-18 09:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restAPI', '0005_event_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updates', models.DateTimeField(auto_now=True)),
+                ('receipt', models.UUIDField(unique=True)),
+                ('status', models.CharField(choices=[('committed', 'Committed'), ('failed', 'Failed')], max_length=16)),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('event', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='restAPI.event')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 
 class BaseModel(models.Model):
@@ -14,6 +15,12 @@ class EventDateData(BaseModel):
     objects = None
     date_suggestion = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_suggestion'],
+                         name='eventdate_suggestion_idx'),
+        ]
+
     def __unicode__(self):
         return self.date_suggestion
 
@@ -23,12 +30,24 @@ class Event(BaseModel):
     name = models.CharField(max_length=255)
     dates = models.ManyToManyField(EventDateData, related_name="event_dates")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='event_name_idx'),
+            models.Index(fields=['created'], name='event_created_idx'),
+        ]
+
     def clean(self):
         raise ValidationError('Problem during validation')
 
     def __str__(self):
         return self.name
 
+    def touch(self):
+        # auto_now only applies on save(), bump the version of the event
+        # without rewriting the row when its votes change
+        self.updates = timezone.now()
+        Event.objects.filter(pk=self.pk).update(updates=self.updates)
+
     @property
     def get_all_event_votes(self):
         return Votes.objects.filter(event=self)
@@ -46,6 +65,12 @@ class People(BaseModel):
     name = models.CharField(max_length=255)
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'name'],
+                                    name='unique_event_people_name'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -57,7 +82,60 @@ class Votes(BaseModel):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     date_voted = models.ForeignKey(EventDateData, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'event', 'date_voted'],
+                                    name='unique_user_event_date_vote'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'date_voted'],
+                         name='votes_event_date_idx'),
+            models.Index(fields=['event', 'user'], name='votes_event_user_idx'),
+        ]
+
     def __unicode__(self):
         return self.date_voted
 
 
+class VoteTally(BaseModel):
+    objects = None
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    date = models.ForeignKey(EventDateData, on_delete=models.CASCADE)
+    vote_count = models.PositiveIntegerField(default=0)
+    participant_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'date'],
+                                    name='unique_event_date_tally'),
+        ]
+        indexes = [
+            models.Index(fields=['event', '-vote_count'],
+                         name='votetally_event_count_idx'),
+        ]
+
+    def __str__(self):
+        return "{}: {}/{}".format(self.date_id, self.vote_count,
+                                  self.participant_count)
+
+
+class VoteReceipt(BaseModel):
+    """
+    Outcome of a vote accepted by the write-behind vote buffer, written in
+    the same transaction as the votes when they commit.
+    """
+    objects = None
+
+    COMMITTED = 'committed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(COMMITTED, 'Committed'), (FAILED, 'Failed')]
+
+    receipt = models.UUIDField(unique=True)
+    event = models.ForeignKey(Event, null=True, on_delete=models.SET_NULL)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES)
+    votes = models.PositiveIntegerField(default=0)
+    detail = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return "{}: {}".format(self.receipt, self.status)
@@ -0,0 +1,83 @@
+import os
+import pstats
+import re
+import time
+from collections import defaultdict
+
+SUFFIX = ".prof"
+
+
+def _route_name(route):
+    return re.sub(r"[^A-Za-z0-9_-]", "_", route)
+
+
+def save_profile(profiler, directory, route, max_bytes):
+    """
+    Dump the stats of a finished cProfile.Profile of one request into
+    directory as <route>.<timestamp>.<pid>.prof, then delete the oldest
+    profiles until the directory holds at most max_bytes.
+    Returns the file name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = "{}.{}.{}{}".format(_route_name(route), time.time_ns(),
+                               os.getpid(), SUFFIX)
+    profiler.dump_stats(os.path.join(directory, name))
+    prune_profiles(directory, max_bytes)
+    return name
+
+
+def _profile_files(directory):
+    try:
+        entries = [entry for entry in os.scandir(directory)
+                   if entry.name.endswith(SUFFIX) and entry.is_file()]
+    except FileNotFoundError:
+        return []
+    return entries
+
+
+def prune_profiles(directory, max_bytes):
+    """
+    Delete the oldest profiles until the ones left add up to max_bytes.
+    Returns the number of deleted files.
+    """
+    files = sorted(((entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                    for entry in _profile_files(directory)), reverse=True)
+    total = 0
+    deleted = 0
+    for modified, name, size in files:
+        total += size
+        if total > max_bytes:
+            try:
+                os.remove(os.path.join(directory, name))
+                deleted += 1
+            except FileNotFoundError:
+                # another process pruned it first
+                pass
+    return deleted
+
+
+def profiles_by_route(directory):
+    routes = defaultdict(list)
+    for entry in _profile_files(directory):
+        route = entry.name[:-len(SUFFIX)].rsplit(".", 2)[0]
+        routes[route].append(entry.path)
+    return dict(routes)
+
+
+def top_functions(paths, sort="cumulative", limit=20):
+    """
+    Merge the profiles in paths and return the limit most expensive
+    functions as dicts, sorted by cumulative or own (tottime) time.
+    """
+    stats = pstats.Stats(*paths)
+    key = {"cumulative": 3, "tottime": 2}[sort]
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][key],
+                  reverse=True)[:limit]
+    return [{
+        "function": "{}:{}({})".format(filename, line, function),
+        "calls": calls,
+        "tottime": round(tottime, 6),
+        "cumtime": round(cumtime, 6),
+        "cumtime_per_sample": round(cumtime / len(paths), 6),
+    } for (filename, line, function), (primitive, calls, tottime, cumtime,
+                                       callers) in rows]
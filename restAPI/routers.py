@@ -0,0 +1,53 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Reads go to the primary unless the current request opted in to the
+# replicas, so management commands, shells and write requests always see
+# their own writes. A request reads every row from the one replica chosen
+# when it opted in, replicas lagging by different amounts would mix
+# versions of the event within a response, and its cache key.
+_replica = ContextVar("replica", default=None)
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    replica = None
+    if enabled and settings.REPLICA_DATABASES:
+        replica = random.choice(settings.REPLICA_DATABASES)
+    token = _replica.set(replica)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send the reads of the event models to the replica of the request when
+    allowed, everything else to the primary. Tokens, users and sessions are always
+    read from the primary so a fresh token works before the next refresh.
+    """
+    replica_apps = {'restAPI'}
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if model._meta.app_label not in self.replica_apps \
+                or replica is None \
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # replicas are copied from the migrated primary
+        return db == DEFAULT_DB_ALIAS
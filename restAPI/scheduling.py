@@ -0,0 +1,140 @@
+import math
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import EventDateData, People, Votes
+
+
+def schedule_options(params, max_top):
+    """
+    Read the availability query options of the results endpoint from the
+    query parameters, empty when only the dates everybody voted for are
+    asked for. Raises ValidationError for invalid values.
+    """
+    options = dict()
+    if 'min_ratio' in params:
+        try:
+            options['min_ratio'] = float(params['min_ratio'])
+        except ValueError:
+            options['min_ratio'] = 0.0
+        if not 0 < options['min_ratio'] <= 1:
+            raise ValidationError(
+                {"min_ratio": ["Must be a number above 0 and at most 1"]})
+    if 'top' in params:
+        try:
+            options['top'] = int(params['top'])
+        except ValueError:
+            options['top'] = 0
+        if not 1 <= options['top'] <= max_top:
+            raise ValidationError(
+                {"top": ["Must be an integer between 1 and {}".format(
+                    max_top)]})
+    if params.getlist('without'):
+        options['without'] = params.getlist('without')
+    return options
+
+
+class AvailabilityMatrix:
+    """
+    The votes of an event as a participants x dates boolean matrix, one
+    Python int per date whose bit i is set when participant i voted for
+    it. Whole columns are combined and counted with int operations, so a
+    query costs one bitwise operation and popcount per date instead of a
+    loop over the votes.
+    """
+
+    def __init__(self, people, dates, votes):
+        """
+        people are (id, name) pairs, dates (id, date) pairs and votes
+        (people id, date id) pairs.
+        """
+        self.names = [name for people_id, name in people]
+        # participant names are unique per event
+        self._bits = {name: bit for bit, name in enumerate(self.names)}
+        bits = {people_id: bit for bit, (people_id, name)
+                in enumerate(people)}
+        self.dates = [date_suggestion for date_id, date_suggestion in dates]
+        columns = {date_id: column for column, (date_id, date_suggestion)
+                   in enumerate(dates)}
+        self.columns = [0] * len(dates)
+        for people_id, date_id in votes:
+            self.columns[columns[date_id]] |= 1 << bits[people_id]
+        self.everyone = (1 << len(people)) - 1
+
+    @staticmethod
+    def _querysets(event_id):
+        # three queries whatever the number of people, dates and votes
+        return (
+            People.objects.filter(event_id=event_id).order_by(
+                'id').values_list('id', 'name'),
+            EventDateData.objects.filter(event_dates=event_id).order_by(
+                'date_suggestion', 'id').values_list('id', 'date_suggestion'),
+            Votes.objects.filter(event_id=event_id).values_list(
+                'user_id', 'date_voted_id'),
+        )
+
+    @classmethod
+    def for_event(cls, event_id):
+        people, dates, votes = cls._querysets(event_id)
+        return cls(list(people), list(dates), votes.iterator())
+
+    @classmethod
+    async def afor_event(cls, event_id):
+        people, dates, votes = cls._querysets(event_id)
+        return cls([row async for row in people], [row async for row in dates],
+                   [row async for row in votes])
+
+    def people_mask(self, without=()):
+        """
+        Mask of the participants left when the named ones drop out.
+        Raises KeyError for a name that is not a participant.
+        """
+        mask = self.everyone
+        for name in without:
+            mask &= ~(1 << self._bits[name])
+        return mask
+
+    def people(self, mask):
+        names = list()
+        while mask:
+            lowest = mask & -mask
+            names.append(self.names[lowest.bit_length() - 1])
+            mask ^= lowest
+        return names
+
+    def counts(self, mask):
+        return [(column & mask).bit_count() for column in self.columns]
+
+    def has_votes(self):
+        return any(self.columns)
+
+    def schedule(self, min_ratio=None, top=None, without=()):
+        """
+        Dates at least min_ratio of the remaining participants voted for,
+        in date order. With top, the top best attended of them ranked like
+        the most-votes endpoint: most votes first, ties go to the date
+        nearest to today. min_ratio defaults to everybody, or to any vote
+        at all when top is given.
+        """
+        if min_ratio is None:
+            min_ratio = 1.0 if top is None else 0.0
+        mask = self.people_mask(without)
+        participants = mask.bit_count()
+        if not participants:
+            return []
+        quorum = max(1, math.ceil(min_ratio * participants - 1e-9))
+        counts = self.counts(mask)
+        matches = [column for column, count in enumerate(counts)
+                   if count >= quorum]
+        if top is not None:
+            today = timezone.localdate()
+            matches = sorted(matches, key=lambda column: (
+                -counts[column], abs(self.dates[column] - today),
+                self.dates[column]))[:top]
+        return [{
+            "date": self.dates[column],
+            "people": self.people(self.columns[column] & mask),
+            "votes": counts[column],
+            "ratio": round(counts[column] / participants, 4),
+        } for column in matches]
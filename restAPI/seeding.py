@@ -0,0 +1,69 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import Event, EventDateData, People, Votes
+from .tallies import rebuild_tallies
+
+FIRST_DATE = date(2024, 1, 1)
+DATE_RANGE_DAYS = 365
+
+
+def seed_events(events, dates, people, votes, seed=0, chunk_size=200):
+    """
+    Generate events events with dates dates each, people participants per
+    event who vote for votes random dates each, with bulk inserts and one
+    transaction per chunk_size events. The same seed gives the same rows.
+    Returns the number of rows written per model and the time taken.
+    """
+    if votes > dates:
+        raise ValueError("votes cannot be more than dates")
+    rng = random.Random(seed)
+    started = time.monotonic()
+    written = {"events": 0, "dates": 0, "people": 0, "votes": 0}
+
+    for first in range(0, events, chunk_size):
+        count = min(chunk_size, events - first)
+        with transaction.atomic():
+            chunk = Event.objects.bulk_create(
+                [Event(name="Benchmark event {}".format(first + number))
+                 for number in range(count)])
+            event_dates = EventDateData.objects.bulk_create(
+                [EventDateData(date_suggestion=FIRST_DATE + timedelta(
+                    days=day))
+                 for _ in chunk
+                 for day in sorted(rng.sample(range(DATE_RANGE_DAYS),
+                                              dates))])
+            through = Event.dates.through
+            through.objects.bulk_create(
+                [through(event_id=event.id,
+                         eventdatedata_id=event_dates[
+                             position * dates + offset].id)
+                 for position, event in enumerate(chunk)
+                 for offset in range(dates)])
+            participants = People.objects.bulk_create(
+                [People(event_id=event.id, name="Person {}".format(number))
+                 for event in chunk for number in range(people)])
+            ballots = list()
+            for position, event in enumerate(chunk):
+                own_dates = event_dates[position * dates:
+                                        (position + 1) * dates]
+                for voter in participants[position * people:
+                                          (position + 1) * people]:
+                    ballots.extend(
+                        Votes(event_id=event.id, user_id=voter.id,
+                              date_voted_id=voted.id)
+                        for voted in rng.sample(own_dates, votes))
+            Votes.objects.bulk_create(ballots, batch_size=1000)
+            # bulk inserts skip the signals that keep the tallies
+            rebuild_tallies([event.id for event in chunk])
+
+        written["events"] += len(chunk)
+        written["dates"] += len(event_dates)
+        written["people"] += len(participants)
+        written["votes"] += len(ballots)
+
+    written["seconds"] = round(time.monotonic() - started, 3)
+    return written
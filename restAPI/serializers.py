@@ -1,32 +1,87 @@
 from datetime import datetime
-from django.db.models import Count
+from django.db import transaction
 from rest_framework import serializers
 from eventschedulingAPI import settings
-from .models import Event, EventDateData, People, Votes
+from .metrics import TimedSerializerMixin
+from .models import Event, EventDateData, People, Votes, VoteTally
+from .scheduling import AvailabilityMatrix
+from .tallies import most_voted_dates, most_voted_payload, refresh_tallies, \
+    suitable_dates, suitable_dates_payload
+from .utils import group_voters_by_date
+from .voting import ingest_ballots, resolve_voted_dates
+
+
+def _field_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients pick the fields of the payload with ?fields=a,b or leave
+    some out with ?omit=c. The other fields are dropped before anything is
+    serialized, so their SerializerMethodField is never evaluated.
+    optional_fields are only included when ?fields= names them, id is
+    always included.
+    """
+
+    optional_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None:
+            params = {}
+        else:
+            params = request.query_params
+        wanted = self.wanted_fields(params)
+        for name in list(self.fields):
+            if name not in wanted:
+                self.fields.pop(name)
+
+    @classmethod
+    def wanted_fields(cls, params):
+        """
+        Names of the fields asked for by the query parameters.
+        Raises ValidationError for a name that is not a field.
+        """
+        available = cls.Meta.fields
+        requested = dict()
+        for param in ('fields', 'omit'):
+            requested[param] = _field_names(params.get(param, ''))
+            unknown = [name for name in requested[param]
+                       if name not in available]
+            if unknown:
+                raise serializers.ValidationError(
+                    {param: ["Unknown field: {}. Must be one of: {}".format(
+                        ", ".join(unknown), ", ".join(available))]})
 
+        if requested['fields']:
+            wanted = set(requested['fields'])
+        else:
+            wanted = set(available) - set(cls.optional_fields)
+        return (wanted - set(requested['omit'])) | {'id'}
 
-class EventDetailSerializer(serializers.ModelSerializer):
+
+class EventDetailSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                            serializers.ModelSerializer):
 
     dates = serializers.SerializerMethodField()
     votes = serializers.SerializerMethodField()
 
     def get_dates(self, obj): # noqa
-        event_dates = obj.dates.all()
-        dates = list()
-        for data in event_dates:
-            dates.append(data.date_suggestion)
-        return dates
+        return [data.date_suggestion for data in obj.dates.all()]
 
     def get_votes(self, obj): # noqa
         votes = list()
 
+        if "voters" in self.context:
+            # loaded up front for a batch of events
+            voters = self.context["voters"][obj.id]
+        else:
+            # one joined query for every vote of the event, grouped per date
+            voters = group_voters_by_date(Votes.objects.filter(event=obj.id))
         for data in obj.dates.all():
-            people_list = list()
-            people_date_votes = Votes.objects.filter(event=obj.id,
-                                                     date_voted=data)
-            for people in people_date_votes:
-                people_list.append(people.user.name)
-
+            people_list = voters.get(data.id)
             if people_list:
                 votes_dict = {"date": data.date_suggestion,
                               "people": people_list}
@@ -38,10 +93,16 @@ class EventDetailSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'dates', 'votes', )
 
 
-class EventListSerializer(serializers.ModelSerializer):
+class EventListSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                          serializers.ModelSerializer):
+    # annotated by the list view, only when asked for
+    date_count = serializers.IntegerField(read_only=True)
+
+    optional_fields = ('date_count', )
+
     class Meta:
         model = Event
-        fields = ('id', 'name', )
+        fields = ('id', 'name', 'date_count', )
 
 
 class CreateNewEventSerializer(serializers.Serializer): # noqa
@@ -52,7 +113,7 @@ class CreateNewEventSerializer(serializers.Serializer): # noqa
     def validate_date(self, dates): # noqa
 
         # check for empty list or wrong date formats in list
-        if dates == ['']:
+        if not dates or dates == ['']:
             raise serializers.ValidationError(
                 "Dates cannot be blank or is not a list of dates: [<date>, <date>]")
         for date in dates:
@@ -63,26 +124,54 @@ class CreateNewEventSerializer(serializers.Serializer): # noqa
                     "Incorrect date format, should be YYYY-MM-DD")
 
     def create_event_data(self, date_data): # noqa
-        date_list = list()
-        for date in date_data:
-            event_date = EventDateData(date_suggestion=date)
-            date_list.append(event_date)
-            event_date.save()
-        return date_list
+        return EventDateData.objects.bulk_create(
+            [EventDateData(date_suggestion=date) for date in date_data])
 
     def update(self, instance, validated_data):
         name = validated_data.get("name", instance.name)
-        dates = validated_data.get("dates", instance.dates)
+        dates = validated_data.get("dates")
 
-        self.validate_date(dates)
-        event_dates = self.create_event_data(dates)
-        instance.name = name
-        instance.save()
-        for event_date in event_dates:
-            instance.dates.add(event_date)
+        with transaction.atomic():
+            if dates is not None:
+                self.validate_date(dates)
+                self.update_event_dates(instance, dates)
+            instance.name = name
+            instance.save()
 
         return instance
 
+    def update_event_dates(self, instance, dates):
+        # compare the current dates of the event with the requested ones
+        requested = {datetime.strptime(date, settings.DATE_INPUT_FORMATS[0]).date()
+                     for date in dates}
+        current = dict()
+        for event_date in instance.dates.all():
+            current.setdefault(event_date.date_suggestion, []).append(event_date.id)
+
+        removed = [date_id for date, date_ids in current.items()
+                   if date not in requested for date_id in date_ids]
+        if removed:
+            policy = self.context.get("removed_votes", "delete")
+            if policy == "reject" and Votes.objects.filter(
+                    event=instance, date_voted__in=removed).exists():
+                raise serializers.ValidationError(
+                    "Removed dates have votes, remove the votes first")
+            # unlink the dates from this event only, a date shared with
+            # another event keeps its link and votes there
+            Votes.objects.filter(event=instance,
+                                 date_voted__in=removed).delete()
+            VoteTally.objects.filter(event=instance, date__in=removed).delete()
+            Event.dates.through.objects.filter(
+                event_id=instance.id, eventdatedata_id__in=removed).delete()
+            EventDateData.objects.filter(
+                id__in=removed, event_dates__isnull=True).delete()
+
+        added = self.create_event_data(sorted(requested - set(current)))
+        Event.dates.through.objects.bulk_create([
+            Event.dates.through(event_id=instance.id,
+                                eventdatedata_id=event_date.id)
+            for event_date in added])
+
     def create(self, validated_data):
         name = validated_data.get("name")
         dates = validated_data.get("dates")
@@ -96,6 +185,30 @@ class CreateNewEventSerializer(serializers.Serializer): # noqa
         return event
 
 
+class CreateVoteBatchSerializer(serializers.ListSerializer): # noqa
+
+    def update(self, instance, validated_data):
+        # validate every ballot up front, before anything is written
+        ballots = dict()
+        for index, ballot in enumerate(validated_data):
+            if not ballot.get("votes"):
+                raise serializers.ValidationError(
+                    {index: ["Please add a date to the votes"]})
+            ballots.setdefault(ballot["name"], set()).update(
+                str(date) for date in ballot["votes"])
+
+        all_dates = set().union(*ballots.values())
+        event_dates = resolve_voted_dates(instance, all_dates)
+        ballots = {name: [event_dates[date] for date in votes]
+                   for name, votes in ballots.items()}
+
+        inserted, skipped = ingest_ballots(
+            instance, ballots,
+            chunk_size=self.context.get("chunk_size", 500))
+        return {"participants": len(ballots), "inserted": inserted,
+                "skipped": skipped}
+
+
 class CreateVoteSerializer(serializers.Serializer): # noqa
     name = serializers.CharField(max_length=255, required=True)
     votes = serializers.ListField(required=False)
@@ -106,67 +219,49 @@ class CreateVoteSerializer(serializers.Serializer): # noqa
         if not votes:
             raise serializers.ValidationError("Please add a date to the votes")
 
-        if name not in instance.get_all_event_votes.values_list("user__name", flat=True):
-            people = People(name=name, event=instance)
-            people.save()
-        else:
-            people = People.objects.filter(event=instance, name=name).first()
-
-        for date in votes:
-            try:
-                event_date = instance.dates.all().get(date_suggestion=date)
-            except Exception:
-                raise serializers.ValidationError("Voted date does not exist for event")
-            vote = Votes.objects.filter(event=instance, user=people,
-                                        date_voted=event_date.id)
-            if not vote:
-                votes = Votes(event=instance, user=people, date_voted=event_date)
-                votes.save()
+        # resolve all voted dates of the event in one query
+        event_dates = set(resolve_voted_dates(instance, votes).values())
+
+        with transaction.atomic():
+            people, created = People.objects.get_or_create(event=instance,
+                                                           name=name)
+            # the unique constraint on votes makes repeated votes a no-op
+            Votes.objects.bulk_create(
+                [Votes(event=instance, user=people, date_voted=event_date)
+                 for event_date in event_dates],
+                ignore_conflicts=True)
+            refresh_tallies(instance.id,
+                            [event_date.id for event_date in event_dates])
+            instance.touch()
 
         return instance
 
     class Meta:
         model = Event
         fields = ()
+        list_serializer_class = CreateVoteBatchSerializer
 
 
-class ResultSerializer(serializers.ModelSerializer):
+class ResultSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                       serializers.ModelSerializer):
     name = serializers.CharField(max_length=255, required=False)
     suitabledates = serializers.SerializerMethodField()
 
     def get_suitabledates(self, obj): # noqa
-        suitable_dates = list()
-        # get all people for event
-        all_people = list(obj.get_all_people.values_list("name", flat=True))
-        # get all votes
-        all_votes = list(obj.get_all_event_votes.values_list("date_voted", flat=True))
-
-        if not all_votes:
-            return "No votes accounted for"
-
-        # get all dates with votes
-        event_days_with_votes = EventDateData.objects.filter(id__in=all_votes)
-        for event_date in event_days_with_votes:
-
-            # check that all participants have voted on the date
-            if sorted(all_people) == sorted(list(Votes.objects.filter(
-                    date_voted=event_date).values_list("user__name", flat=True))):
-                suitable_date = event_date
-
-                # get the names of the people that votes
-                people_votes = Votes.objects.filter(event=obj.id,
-                                                    date_voted=suitable_date)\
-                    .values_list('user__name', flat=True)
-
-                result_dict = {"date": suitable_date.date_suggestion,
-                               "people": people_votes}
-
-                suitable_dates.append(result_dict)
-
-        if suitable_dates:
-            return suitable_dates
-        else:
-            return []
+        schedule = self.context.get("schedule")
+        if not schedule:
+            return suitable_dates_payload(list(suitable_dates(obj.id)))
+
+        # quorum, top and drop out queries run on the availability matrix
+        matrix = AvailabilityMatrix.for_event(obj.id)
+        if not matrix.has_votes():
+            return suitable_dates_payload([])
+        try:
+            return matrix.schedule(**schedule)
+        except KeyError as error:
+            raise serializers.ValidationError(
+                {"without": ["{} is not a participant of this event".format(
+                    error.args[0])]})
 
     class Meta:
         model = Event
@@ -174,40 +269,16 @@ class ResultSerializer(serializers.ModelSerializer):
 
 
 # We can use this serializer to get the closest suitable
-# date where most participants voted
-class MostVotedDateSerializer(serializers.ModelSerializer):
+# dates where most participants voted
+class MostVotedDateSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                              serializers.ModelSerializer):
     name = serializers.CharField(max_length=255, required=False)
     closest_suitable_date = serializers.SerializerMethodField()
 
     def get_closest_suitable_date(self, obj):  # noqa
-        suitable_dates = list()
-        # get all votes
-        all_votes = list(obj.get_all_event_votes.values_list("date_voted", flat=True))
-        # get all dates with votes
-        event_days_with_votes = EventDateData.objects.filter(id__in=all_votes)
-
-        # count the votes
-        count_of_voted_days = event_days_with_votes.order_by().annotate(
-            date_voted_count=Count('date_suggestion'))
-        if count_of_voted_days:
-            # get the day with most votes
-            most_voted_date = count_of_voted_days.latest("date_voted_count")
-
-            # get the names of the people that votes
-            people_votes = Votes.objects.filter(event=obj.id,
-                                                date_voted=most_voted_date) \
-                .values_list('user__name', flat=True)
-            if most_voted_date:
-                result_dict = {"date": most_voted_date.date_suggestion,
-                               "people": people_votes}
-
-                suitable_dates.append(result_dict)
-            else:
-                suitable_dates.append("No suitable dates")
-            return suitable_dates
-        else:
-            return "No votes accounted for"
+        top = self.context.get("top", 1)
+        return most_voted_payload(list(most_voted_dates(obj.id, top)))
 
     class Meta:
         model = Event
-        fields = ('id', 'name', 'closest_suitable_date',)
\ No newline at end of file
+        fields = ('id', 'name', 'closest_suitable_date',)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import tallies
+from .authentication import token_cache
+from .database import apply_sqlite_pragmas
+from .metrics import install_query_timer
+from .models import Event, EventDateData, People, Votes
+
+
+def _touch(events):
+    # cached responses and ETags follow the updates timestamp of the event
+    Event.objects.filter(pk__in=events).update(updates=timezone.now())
+
+
+def _edited_events(instance):
+    return {instance.event_id, getattr(instance, '_saved_event_id', None)} \
+        - {None}
+
+
+def _deleted_on_its_own(origin):
+    # deleting an event or a date cascades to its tallies as well
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (Votes, People)
+
+
+@receiver(pre_save, sender=Votes)
+@receiver(pre_save, sender=People)
+def remember_event(sender, instance, **kwargs):  # noqa
+    # an edit may move the row to another event, both are recounted
+    if instance.pk is not None:
+        instance._saved_event_id = sender.objects.filter(
+            pk=instance.pk).values_list('event_id', flat=True).first()
+
+
+@receiver(post_save, sender=Votes)
+def count_vote(sender, instance, created, **kwargs):  # noqa
+    if created:
+        tallies.vote_added(instance)
+    else:
+        tallies.rebuild_tallies(_edited_events(instance))
+    _touch(_edited_events(instance))
+
+
+@receiver(post_save, sender=People)
+def count_participant(sender, instance, created, **kwargs):  # noqa
+    if created:
+        tallies.participant_added(instance)
+    else:
+        tallies.rebuild_tallies(_edited_events(instance))
+    _touch(_edited_events(instance))
+
+
+@receiver(post_save, sender=EventDateData)
+def touch_date_events(sender, instance, created, **kwargs):  # noqa
+    if not created:
+        _touch(Event.objects.filter(dates=instance).values('pk'))
+
+
+@receiver(post_delete, sender=Votes)
+def uncount_vote(sender, instance, origin=None, **kwargs):  # noqa
+    if _deleted_on_its_own(origin):
+        tallies.vote_removed(instance)
+        _touch([instance.event_id])
+
+
+@receiver(post_delete, sender=People)
+def uncount_participant(sender, instance, origin=None, **kwargs):  # noqa
+    if _deleted_on_its_own(origin):
+        tallies.participant_removed(instance)
+        _touch([instance.event_id])
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):  # noqa
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_user_tokens(sender, instance, created, **kwargs):  # noqa
+    # deactivated users or changed permissions must not outlive the cache
+    if not created:
+        token_cache.invalidate_user(
+            instance.pk,
+            Token.objects.filter(user=instance).values_list("key", flat=True))
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):  # noqa
+    apply_sqlite_pragmas(connection)
+    install_query_timer(connection)
@@ -0,0 +1,157 @@
+from django.db import transaction
+from django.db.models import Case, Count, DurationField, ExpressionWrapper, \
+    F, Func, OuterRef, Value, When
+from django.utils import timezone
+
+from .models import People, Votes, VoteTally
+from .utils import voter_names
+
+
+def vote_added(vote):
+    # bump the tally of the voted date, create it on the first vote
+    updated = VoteTally.objects.filter(
+        event_id=vote.event_id, date_id=vote.date_voted_id).update(
+        vote_count=F('vote_count') + 1)
+    if not updated:
+        VoteTally.objects.create(
+            event_id=vote.event_id, date_id=vote.date_voted_id, vote_count=1,
+            participant_count=People.objects.filter(
+                event_id=vote.event_id).count())
+
+
+def participant_added(people):
+    VoteTally.objects.filter(event_id=people.event_id).update(
+        participant_count=F('participant_count') + 1)
+
+
+def vote_removed(vote):
+    refresh_tallies(vote.event_id, [vote.date_voted_id])
+
+
+def participant_removed(people):
+    # the votes of the participant are deleted and recounted first
+    VoteTally.objects.filter(event_id=people.event_id).update(
+        participant_count=F('participant_count') - 1)
+
+
+def refresh_tallies(event_id, date_ids):
+    """
+    Recount the tallies of the given dates of an event from Votes.
+    Bulk inserts skip the post_save signals, so they refresh the touched
+    dates with this in the same transaction instead.
+    """
+    with transaction.atomic():
+        participant_count = People.objects.filter(event_id=event_id).count()
+        counts = Votes.objects.filter(
+            event_id=event_id, date_voted_id__in=date_ids).order_by().values(
+            'date_voted').annotate(count=Count('id')).values_list(
+            'date_voted', 'count')
+
+        VoteTally.objects.filter(event_id=event_id,
+                                 date_id__in=date_ids).delete()
+        VoteTally.objects.bulk_create([
+            VoteTally(event_id=event_id, date_id=date_id, vote_count=count,
+                      participant_count=participant_count)
+            for date_id, count in counts
+        ])
+
+
+def expected_tallies(event_ids=None):
+    """
+    Recompute the tallies from the raw Votes rows, keyed by
+    (event id, date id) with (vote count, participant count) values.
+    """
+    votes = Votes.objects.all()
+    people = People.objects.all()
+    if event_ids is not None:
+        votes = votes.filter(event_id__in=event_ids)
+        people = people.filter(event_id__in=event_ids)
+
+    participants = dict(people.order_by().values('event').annotate(
+        count=Count('id')).values_list('event', 'count'))
+    rows = votes.order_by().values('event', 'date_voted').annotate(
+        count=Count('id')).values_list('event', 'date_voted', 'count')
+    return {(event_id, date_id): (count, participants.get(event_id, 0))
+            for event_id, date_id, count in rows}
+
+
+def find_drift(event_ids=None):
+    """
+    Compare the stored tallies with the raw votes and return the keys whose
+    counts differ, together with the stored and expected values.
+    """
+    tallies = VoteTally.objects.all()
+    if event_ids is not None:
+        tallies = tallies.filter(event_id__in=event_ids)
+    stored = {(event_id, date_id): (vote_count, participant_count)
+              for event_id, date_id, vote_count, participant_count
+              in tallies.values_list('event', 'date', 'vote_count',
+                                     'participant_count')}
+    expected = expected_tallies(event_ids)
+
+    drift = list()
+    for key in sorted(set(stored) | set(expected)):
+        if stored.get(key) != expected.get(key):
+            drift.append((key, stored.get(key), expected.get(key)))
+    return drift
+
+
+def rebuild_tallies(event_ids=None):
+    """
+    Replace the stored tallies with counts recomputed from Votes.
+    Returns the number of tally rows written.
+    """
+    with transaction.atomic():
+        expected = expected_tallies(event_ids)
+        tallies = VoteTally.objects.all()
+        if event_ids is not None:
+            tallies = tallies.filter(event_id__in=event_ids)
+        tallies.delete()
+        VoteTally.objects.bulk_create([
+            VoteTally(event_id=event_id, date_id=date_id, vote_count=count,
+                      participant_count=participant_count)
+            for (event_id, date_id), (count, participant_count)
+            in expected.items()
+        ])
+    return len(expected)
+
+
+def suitable_dates(event_id):
+    """
+    One indexed read of the tallies of an event, the voter names are only
+    collected for the dates all participants have voted on.
+    """
+    return VoteTally.objects.filter(event_id=event_id, vote_count__gt=0).annotate(
+        people=Case(When(vote_count=F('participant_count'),
+                         then=voter_names(OuterRef('event'),
+                                          OuterRef('date'))))).order_by(
+        'date').values_list('date__date_suggestion', 'people')
+
+
+def suitable_dates_payload(rows):
+    if not rows:
+        return "No votes accounted for"
+    return [{"date": date_suggestion, "people": people}
+            for date_suggestion, people in rows if people is not None]
+
+
+def most_voted_dates(event_id, top):
+    """
+    Rank the tallies of an event by vote count and collect the voter names
+    in the same query, ties go to the date nearest to today.
+    """
+    distance = Func(ExpressionWrapper(
+        F('date__date_suggestion') - Value(timezone.localdate()),
+        output_field=DurationField()), function='ABS')
+    return VoteTally.objects.filter(event_id=event_id, vote_count__gt=0).annotate(
+        people=voter_names(OuterRef('event'), OuterRef('date'))).alias(
+        distance=distance).order_by(
+        '-vote_count', 'distance', 'date__date_suggestion').values_list(
+        'date__date_suggestion', 'vote_count', 'people')[:top]
+
+
+def most_voted_payload(rows):
+    if not rows:
+        return "No votes accounted for"
+    return [{"date": date_suggestion, "votes": vote_count, "people": people}
+            for date_suggestion, vote_count, people in rows]
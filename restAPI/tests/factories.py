@@ -45,3 +45,14 @@ class VotesFactory(DjangoModelFactory):
 
     class Meta:
         model = Votes
+
+
+def create_voted_event(dates, voters):
+    """An event with `dates` dates and `voters` people voting on every date."""
+    event_dates = [EventDateDataFactory() for _ in range(dates)]
+    event = EventFactory(dates=event_dates)
+    for _ in range(voters):
+        voter = PeopleFactory(event=event)
+        for event_date in event_dates:
+            VotesFactory(date_voted=event_date, user=voter, event=event)
+    return event
@@ -0,0 +1,59 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# a SCAN reads every row of the table, SQLite before 3.36 says SCAN TABLE
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\S+)')
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+
+def explain_query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def query_plans(queries):
+    """
+    Run EXPLAIN QUERY PLAN for captured queries and return the
+    (detail, sql) pairs of every plan row.
+    """
+    plans = list()
+    for query in queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            continue
+        plans.extend((detail.strip(), sql)
+                     for detail in explain_query_plan(sql))
+    return plans
+
+
+def full_table_scans(plans, allowed=()):
+    """
+    The (table, sql) pairs of the query_plans rows that scan a whole
+    table, except the allowed tables.
+    """
+    scans = list()
+    for detail, sql in plans:
+        match = FULL_SCAN.match(detail)
+        if match and match.group(1) not in allowed:
+            scans.append((match.group(1), sql))
+    return scans
+
+
+class QueryPlanMixin:
+
+    def assertNoFullTableScans(self, func, allowed=()):  # NOQA
+        """
+        Call func and fail when one of the queries it runs does a full table
+        scan on a table that is not allowed.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            result = func()
+        plans = query_plans(queries.captured_queries)
+        # no plan rows would make the check below pass without checking
+        self.assertTrue(plans, "no query plans to check")
+        scans = full_table_scans(plans, allowed)
+        self.assertFalse(scans, "full table scans: {}".format(scans))
+        return result
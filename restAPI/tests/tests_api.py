@@ -1,14 +1,31 @@
+import csv
 import json
+import os
+import tempfile
 
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.encoding import force_str
 from rest_framework.authtoken.admin import User
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
-from tests.factories import create_token, EventFactory, EventDateDataFactory, \
-    VotesFactory, PeopleFactory
+from restAPI.authentication import CachedToken, token_cache
+from restAPI.buffering import new_receipt, vote_buffer
+from restAPI.caching import cache_stats, event_cache
+from restAPI.metrics import request_metrics
+from restAPI.models import Event, EventDateData, VoteTally
+from restAPI.tallies import find_drift
+from tests.factories import create_token, create_voted_event, EventFactory, \
+    EventDateDataFactory, VotesFactory, PeopleFactory
 
 
 class EventApiTestCase(APITestCase):
 
+    def setUp(self):
+        # database ids are reused between tests, cached responses are not
+        event_cache().clear()
+
     def assertContainsKeys(self, data, *keys):  # NOQA
         for key in keys:
             self.assertTrue(key in data, "key '%s' missing from data" % key)
@@ -40,10 +57,14 @@ class ApiAuthenticationTokenTest(EventApiTestCase):
 class AuthenticatedEventAPITestCase(EventApiTestCase):
 
     def setUp(self):
+        super().setUp()
         user = User.objects.create_user(
             'user01', 'user01@example.com', 'user01P4ssw0rD')
         self.token = create_token(user)
         self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        # keep the token lookup out of the query counts
+        token_cache.set(self.token.key, Token.objects.select_related(
+            "user").get(key=self.token.key))
 
 
 class EventSchedulingBaseApiTests(AuthenticatedEventAPITestCase):
@@ -220,3 +241,1025 @@ class EventSchedulingBaseApiTests(AuthenticatedEventAPITestCase):
             event_date2.date_suggestion,
             status_code=200,
         )
+
+    def test_event_detail_query_count_is_constant(self):
+        def detail_query_count(event):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get("/api/v1/event/{}/".format(event.id))
+            self.assertEqual(resp.status_code, 200)
+            return len(queries)
+
+        # small event: one date, one voter
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        small_event = EventFactory(dates=[event_date])
+        VotesFactory(date_voted=event_date, event=small_event,
+                     user=PeopleFactory(event=small_event))
+
+        # large event: many dates, every voter votes on every date
+        large_event = create_voted_event(10, 10)
+
+        self.assertEqual(detail_query_count(small_event),
+                         detail_query_count(large_event))
+
+    def test_results_query_count_is_constant(self):
+        def results_query_count(event):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get("/api/v1/event/{}/results/".format(event.id))
+            self.assertEqual(resp.status_code, 200)
+            return len(queries)
+
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        small_event = EventFactory(dates=[event_date])
+        VotesFactory(date_voted=event_date, event=small_event,
+                     user=PeopleFactory(event=small_event))
+
+        large_event = create_voted_event(10, 10)
+
+        self.assertEqual(results_query_count(small_event),
+                         results_query_count(large_event))
+        resp = self.client.get("/api/v1/event/{}/results/".format(large_event.id))
+        self.assertEqual(len(resp.data["suitabledates"]), 10)
+        self.assertEqual(len(resp.data["suitabledates"][0]["people"]), 10)
+
+    def test_most_votes(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-15")
+        event_date3 = EventDateDataFactory(date_suggestion="2023-05-18")
+        event = EventFactory(dates=[event_date, event_date2, event_date3])
+
+        voter = PeopleFactory(event=event, name="Karl")
+        voter2 = PeopleFactory(event=event, name="Ben")
+
+        VotesFactory(date_voted=event_date, user=voter, event=event)
+        VotesFactory(date_voted=event_date2, user=voter, event=event)
+        VotesFactory(date_voted=event_date2, user=voter2, event=event)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(
+                "/api/v1/event/{}/most-votes/".format(event.id))
+        self.assertEqual(resp.status_code, 200)
+        # updates lookup, event and the tally query
+        self.assertEqual(len(queries), 3)
+        most_voted = resp.data["closest_suitable_date"]
+        self.assertEqual(len(most_voted), 1)
+        self.assertEqual(str(most_voted[0]["date"]), "2023-05-15")
+        self.assertEqual(most_voted[0]["votes"], 2)
+        self.assertEqual(sorted(most_voted[0]["people"]), ["Ben", "Karl"])
+
+    def test_most_votes_top_ties_nearest_date_first(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-15")
+        event_date3 = EventDateDataFactory(date_suggestion="2023-05-18")
+        event = EventFactory(dates=[event_date, event_date2, event_date3])
+
+        voter = PeopleFactory(event=event)
+        voter2 = PeopleFactory(event=event)
+        VotesFactory(date_voted=event_date, user=voter, event=event)
+        VotesFactory(date_voted=event_date3, user=voter, event=event)
+        VotesFactory(date_voted=event_date3, user=voter2, event=event)
+        VotesFactory(date_voted=event_date2, user=voter2, event=event)
+
+        resp = self.client.get(
+            "/api/v1/event/{}/most-votes/?top=3".format(event.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            [str(row["date"]) for row in resp.data["closest_suitable_date"]],
+            ["2023-05-18", "2023-05-15", "2023-05-10"])
+
+    def test_most_votes_invalid_top(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+
+        resp = self.client.get(
+            "/api/v1/event/{}/most-votes/?top=zero".format(event.id))
+        self.assertEqual(resp.status_code, 400)
+        self.assertContainsKeys(resp.data, "top")
+
+    def test_vote_updates_tallies(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-12")
+        event = EventFactory(dates=[event_date, event_date2])
+
+        self.client.post("/api/v1/event/{}/vote/".format(event.id),
+                         {"name": "Karl", "votes": ["2023-05-10"]})
+        self.client.post("/api/v1/event/{}/vote/".format(event.id),
+                         {"name": "Ben", "votes": ["2023-05-10", "2023-05-12"]})
+
+        tallies = VoteTally.objects.filter(event=event).order_by("date_id")
+        self.assertEqual(
+            [(tally.vote_count, tally.participant_count) for tally in tallies],
+            [(2, 2), (1, 2)])
+
+        resp = self.client.get("/api/v1/event/{}/results/".format(event.id))
+        self.assertEqual(str(resp.data["suitabledates"][0]["date"]),
+                         "2023-05-10")
+        self.assertEqual(sorted(resp.data["suitabledates"][0]["people"]),
+                         ["Ben", "Karl"])
+
+    def test_repeated_vote_is_idempotent(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-12")
+        event = EventFactory(dates=[event_date, event_date2])
+        data = {"name": "Karl", "votes": ["2023-05-10", "2023-05-12"]}
+
+        self.client.post("/api/v1/event/{}/vote/".format(event.id), data)
+        resp = self.client.post("/api/v1/event/{}/vote/".format(event.id), data)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(event.people_set.count(), 1)
+        self.assertEqual(event.votes_set.count(), 2)
+        self.assertEqual(
+            sorted(VoteTally.objects.filter(event=event).values_list(
+                "vote_count", flat=True)), [1, 1])
+
+    def test_vote_with_unknown_date_creates_nothing(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        data = {"name": "Karl", "votes": ["2023-05-10", "2023-05-12"]}
+
+        resp = self.client.post("/api/v1/event/{}/vote/".format(event.id), data)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(event.people_set.count(), 0)
+        self.assertEqual(event.votes_set.count(), 0)
+
+    def test_vote_batch(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-12")
+        event = EventFactory(dates=[event_date, event_date2])
+        self.client.post("/api/v1/event/{}/vote/".format(event.id),
+                         {"name": "Karl", "votes": ["2023-05-10"]})
+
+        data = [{"name": "Karl", "votes": ["2023-05-10", "2023-05-12"]}]
+        data += [{"name": "Voter {}".format(i), "votes": ["2023-05-10"]}
+                 for i in range(50)]
+        resp = self.client.post("/api/v1/event/{}/vote-batch/".format(event.id),
+                                data, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data, {"id": event.id, "participants": 51,
+                                     "inserted": 51, "skipped": 1})
+        self.assertEqual(event.people_set.count(), 51)
+
+        resp = self.client.get("/api/v1/event/{}/results/".format(event.id))
+        self.assertEqual(len(resp.data["suitabledates"]), 1)
+        self.assertEqual(len(resp.data["suitabledates"][0]["people"]), 51)
+
+    def test_vote_batch_rejects_whole_batch(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+
+        data = [{"name": "Karl", "votes": ["2023-05-10"]},
+                {"name": "Ben", "votes": ["2023-05-12"]}]
+        resp = self.client.post("/api/v1/event/{}/vote-batch/".format(event.id),
+                                data, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertContains(resp, 'Voted date does not exist for event',
+                            status_code=400)
+        self.assertEqual(event.votes_set.count(), 0)
+
+    def test_bulk_import_json(self):
+        data = [{"name": "Event {}".format(i),
+                 "dates": ["2023-05-10", "2023-05-12"]} for i in range(5)]
+        resp = self.client.post("/api/v1/event/bulk/?chunk_size=2", data,
+                                format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data["events"], 5)
+        # events, dates and the through rows
+        self.assertEqual(resp.data["rows"], 25)
+        self.assertContainsKeys(resp.data, "rows_per_second")
+
+        event = Event.objects.get(name="Event 3")
+        self.assertEqual(
+            sorted(str(date) for date in
+                   event.dates.values_list("date_suggestion", flat=True)),
+            ["2023-05-10", "2023-05-12"])
+
+    def test_bulk_import_ndjson_and_csv(self):
+        body = '{"name": "First", "dates": ["2023-05-10"]}\n' \
+               '{"name": "Second", "dates": ["2023-05-11", "2023-05-12"]}\n'
+        resp = self.client.post("/api/v1/event/bulk/", body,
+                                content_type="application/x-ndjson")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data["events"], 2)
+
+        body = 'name,dates\nThird,2023-05-10;2023-05-11\n'
+        resp = self.client.post("/api/v1/event/bulk/", body,
+                                content_type="text/csv")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Event.objects.get(name="Third").dates.count(), 2)
+
+    def test_bulk_import_invalid_record_imports_nothing(self):
+        data = [{"name": "Event {}".format(i), "dates": ["2023-05-10"]}
+                for i in range(3)]
+        data.append({"name": "Broken", "dates": ["2023/05/10"]})
+        resp = self.client.post("/api/v1/event/bulk/?chunk_size=2", data,
+                                format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertContains(resp, "record 4: Incorrect date format",
+                            status_code=400)
+        self.assertEqual(Event.objects.count(), 0)
+
+    def test_bulk_import_non_string_name(self):
+        resp = self.client.post("/api/v1/event/bulk/",
+                                [{"name": 123, "dates": ["2023-05-10"]}],
+                                format="json")
+        self.assertContains(resp, "record 1: Name must be a string",
+                            status_code=400)
+
+    def test_update_event_replaces_dates(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-12")
+        event = EventFactory(dates=[event_date, event_date2])
+        VotesFactory(date_voted=event_date, event=event,
+                     user=PeopleFactory(event=event))
+
+        data = {"name": "My updated Event",
+                "dates": ["2023-05-12", "2023-05-15"]}
+        self.client.put("/api/v1/event/{}/".format(event.id), data)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.put("/api/v1/event/{}/".format(event.id), data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertLessEqual(len(queries), 8)
+
+        self.assertEqual(
+            sorted(str(date) for date in
+                   event.dates.values_list("date_suggestion", flat=True)),
+            ["2023-05-12", "2023-05-15"])
+        # the removed date and its votes are gone
+        self.assertFalse(EventDateData.objects.filter(id=event_date.id).exists())
+        self.assertEqual(event.votes_set.count(), 0)
+        self.assertFalse(VoteTally.objects.filter(event=event).exists())
+
+    def test_update_event_keeps_shared_dates(self):
+        shared_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[shared_date])
+        other_event = EventFactory(dates=[shared_date])
+        VotesFactory(date_voted=shared_date, event=event,
+                     user=PeopleFactory(event=event))
+        VotesFactory(date_voted=shared_date, event=other_event,
+                     user=PeopleFactory(event=other_event))
+        other_event.refresh_from_db()
+        other_updates = other_event.updates
+
+        resp = self.client.put("/api/v1/event/{}/".format(event.id),
+                               {"name": "My updated Event",
+                                "dates": ["2023-05-12"]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(event.votes_set.count(), 0)
+        # the other event keeps the date, its votes and its version
+        self.assertEqual(other_event.dates.get().id, shared_date.id)
+        self.assertEqual(other_event.votes_set.count(), 1)
+        self.assertEqual(VoteTally.objects.get(event=other_event).vote_count, 1)
+        other_event.refresh_from_db()
+        self.assertEqual(other_event.updates, other_updates)
+        self.assertEqual(find_drift(), [])
+
+    @override_settings(REMOVED_DATE_VOTES="reject")
+    def test_update_event_rejects_removing_voted_dates(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        VotesFactory(date_voted=event_date, event=event,
+                     user=PeopleFactory(event=event))
+
+        resp = self.client.put("/api/v1/event/{}/".format(event.id),
+                               {"name": "My updated Event",
+                                "dates": ["2023-05-12"]})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(event.dates.get().id, event_date.id)
+        event.refresh_from_db()
+        self.assertEqual(event.name, "The Greatest Event")
+
+    def test_update_event_rejects_empty_dates(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        VotesFactory(date_voted=event_date, event=event,
+                     user=PeopleFactory(event=event))
+
+        for method in (self.client.put, self.client.patch):
+            resp = method("/api/v1/event/{}/".format(event.id),
+                          {"name": "My updated Event", "dates": []},
+                          format="json")
+            self.assertEqual(resp.status_code, 400)
+        self.assertEqual(event.dates.get().id, event_date.id)
+        self.assertEqual(VoteTally.objects.get(event=event).vote_count, 1)
+
+    def test_partial_update_event(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+
+        resp = self.client.patch("/api/v1/event/{}/".format(event.id),
+                                 {"name": "My patched Event"})
+        self.assertEqual(resp.status_code, 200)
+        event.refresh_from_db()
+        self.assertEqual(event.name, "My patched Event")
+        self.assertEqual(event.dates.get().id, event_date.id)
+
+    def test_delete_event_removes_related_rows(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        shared_date = EventDateDataFactory(date_suggestion="2023-05-12")
+        event.dates.add(shared_date)
+        other_event = EventFactory(dates=[shared_date])
+        VotesFactory(date_voted=event_date, event=event,
+                     user=PeopleFactory(event=event))
+
+        resp = self.client.delete("/api/v1/event/{}/".format(event.id))
+        self.assertEqual(resp.status_code, 204)
+        self.assertFalse(Event.objects.filter(id=event.id).exists())
+        self.assertFalse(EventDateData.objects.filter(id=event_date.id).exists())
+        self.assertFalse(VoteTally.objects.exists())
+        # dates linked to another event are kept
+        self.assertEqual(other_event.dates.get().id, shared_date.id)
+
+    def test_bulk_delete_events(self):
+        events = [EventFactory(dates=[EventDateDataFactory()])
+                  for _ in range(3)]
+
+        resp = self.client.delete("/api/v1/event/?ids={},{},999".format(
+            events[0].id, events[1].id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["deleted"], 2)
+        self.assertEqual(list(Event.objects.values_list("id", flat=True)),
+                         [events[2].id])
+        self.assertEqual(EventDateData.objects.count(), 1)
+
+        resp = self.client.delete("/api/v1/event/?ids=abc")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_list_events_cursor_pagination(self):
+        events = [EventFactory(name="Event {}".format(i)) for i in range(25)]
+
+        names = list()
+        url = "/api/v1/event/list/?pagination=cursor"
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotIn("count", resp.data)
+            self.assertFalse([query for query in queries.captured_queries
+                              if "COUNT(" in query["sql"]])
+            names += [event["name"] for event in resp.data["events"]]
+            url = resp.data["next"]
+        self.assertEqual(names, [event.name for event in events])
+
+        resp = self.client.get(
+            "/api/v1/event/list/?pagination=cursor&order_by=created&page_size=5")
+        self.assertEqual([event["name"] for event in resp.data["events"]],
+                         [event.name for event in reversed(events[-5:])])
+        resp = self.client.get(resp.data["next"])
+        self.assertEqual([event["name"] for event in resp.data["events"]],
+                         [event.name for event in reversed(events[-10:-5])])
+
+        resp = self.client.get("/api/v1/event/list/?pagination=cursor&order_by=name")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_cached_results_invalidated_by_vote(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        url = "/api/v1/event/{}/results/".format(event.id)
+
+        resp = self.client.get(url)
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertEqual(resp.data["suitabledates"], "No votes accounted for")
+        stats = cache_stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp["X-Cache"], "HIT")
+        # only the updates lookup
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(cache_stats()["hits"], stats["hits"] + 1)
+
+        self.client.post("/api/v1/event/{}/vote/".format(event.id),
+                         {"name": "Karl", "votes": ["2023-05-10"]})
+        resp = self.client.get(url)
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertEqual(resp.data["suitabledates"][0]["people"], ["Karl"])
+
+        resp = self.client.get("/api/v1/cache-stats/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertContainsKeys(resp.data["events"], "hits", "misses",
+                                "hit_ratio")
+
+    def test_cache_follows_writes_outside_the_api(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        url = "/api/v1/event/{}/results/".format(event.id)
+        etag = self.client.get(url)["ETag"]
+
+        # another worker or a script, nothing invalidates this process
+        VotesFactory(date_voted=event_date, event=event,
+                     user=PeopleFactory(event=event, name="Karl"))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertEqual(resp.data["suitabledates"][0]["people"], ["Karl"])
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_cache_key_uses_the_event_id(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        url = "/api/v1/event/0{}/results/".format(event.id)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.post("/api/v1/event/{}/vote/".format(event.id),
+                         {"name": "Karl", "votes": ["2023-05-10"]})
+        resp = self.client.get(url)
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertEqual(resp.data["suitabledates"][0]["people"], ["Karl"])
+        self.assertTrue(resp["ETag"].startswith('"{}-'.format(event.id)))
+
+    def test_cached_detail_invalidated_by_update(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        url = "/api/v1/event/{}/".format(event.id)
+
+        self.client.get(url)
+        self.client.patch(url, {"name": "My patched Event"})
+        resp = self.client.get(url)
+        self.assertEqual(resp["X-Cache"], "MISS")
+        self.assertEqual(resp.data["name"], "My patched Event")
+
+    def test_conditional_get(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+
+        for url in ["/api/v1/event/{}/".format(event.id),
+                    "/api/v1/event/{}/results/".format(event.id),
+                    "/api/v1/event/{}/most-votes/".format(event.id)]:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            etag = resp["ETag"]
+            self.assertTrue(resp.has_header("Last-Modified"))
+
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 304)
+            # only the updates lookup
+            self.assertEqual(len(queries), 1)
+
+            resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"])
+            self.assertEqual(resp.status_code, 304)
+
+        # voting bumps the version of the event
+        url = "/api/v1/event/{}/results/".format(event.id)
+        etag = self.client.get(url)["ETag"]
+        self.client.post("/api/v1/event/{}/vote/".format(event.id),
+                         {"name": "Karl", "votes": ["2023-05-10"]})
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+
+class CachedTokenAuthenticationTest(EventApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            'user01', 'user01@example.com', 'user01P4ssw0rD')
+        self.token = create_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.client.get("/api/v1/event/list/").status_code, 200)
+        hits = token_cache.stats()["hits"]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/v1/event/list/")
+        self.assertFalse([query for query in queries.captured_queries
+                          if "authtoken_token" in query["sql"]])
+        self.assertEqual(token_cache.stats()["hits"], hits + 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.client.get("/api/v1/event/list/").status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.client.get("/api/v1/event/list/").status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get("/api/v1/event/list/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/v1/event/list/").status_code, 401)
+
+    def test_cache_holds_no_user_row(self):
+        self.assertEqual(self.client.get("/api/v1/event/list/").status_code, 200)
+        self.assertEqual(token_cache.get(self.token.key),
+                         CachedToken(self.token.key, self.user.id, True))
+
+
+class ExportEventsTest(AuthenticatedEventAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-12")
+        self.event = EventFactory(dates=[event_date, event_date2])
+        VotesFactory(date_voted=event_date, event=self.event,
+                     user=PeopleFactory(event=self.event, name="Karl"))
+
+    def test_export_ndjson(self):
+        EventFactory(name="Second", dates=[EventDateDataFactory()])
+        resp = self.client.get("/api/v1/event/export/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        event = json.loads(lines[0])
+        self.assertEqual(event["name"], "The Greatest Event")
+        self.assertEqual(sorted(event["dates"]), ["2023-05-10", "2023-05-12"])
+        self.assertEqual(event["votes"], [{"date": "2023-05-10", "name": "Karl"}])
+
+    def test_export_csv(self):
+        resp = self.client.get("/api/v1/event/export/?output=csv")
+        self.assertEqual(resp.status_code, 200)
+        rows = list(csv.DictReader(
+            b"".join(resp.streaming_content).decode().splitlines()))
+        self.assertEqual(sorted((row["date"], row["voter"]) for row in rows),
+                         [("2023-05-10", "Karl"), ("2023-05-12", "")])
+
+    def test_export_since(self):
+        since = self.event.updates.isoformat()
+        resp = self.client.get("/api/v1/event/export/", {"since": since})
+        self.assertEqual(len(b"".join(resp.streaming_content).splitlines()), 1)
+
+        resp = self.client.get("/api/v1/event/export/",
+                               {"since": "2999-01-01T00:00:00+00:00"})
+        self.assertEqual(b"".join(resp.streaming_content), b"")
+
+        resp = self.client.get("/api/v1/event/export/?since=yesterday")
+        self.assertEqual(resp.status_code, 400)
+
+
+class AsyncReadPathTest(AuthenticatedEventAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event_date2 = EventDateDataFactory(date_suggestion="2023-05-12")
+        self.event = EventFactory(dates=[event_date, event_date2])
+        voter = PeopleFactory(event=self.event, name="Karl")
+        VotesFactory(date_voted=event_date, event=self.event, user=voter)
+        VotesFactory(date_voted=event_date2, event=self.event, user=voter)
+        VotesFactory(date_voted=event_date2, event=self.event,
+                     user=PeopleFactory(event=self.event, name="Ben"))
+
+    def assertSamePayload(self, path):  # NOQA
+        sync = self.client.get("/api/v1/" + path)
+        event_cache().clear()
+        asynchronous = self.client.get("/api/v1/async/" + path)
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        # pagination links point back at the path that was requested
+        self.assertEqual(
+            json.loads(asynchronous.content.replace(b"/async/", b"/")),
+            json.loads(sync.content))
+        return asynchronous
+
+    def test_same_payloads_as_sync_views(self):
+        EventFactory(name="Second", dates=[EventDateDataFactory()])
+        self.assertSamePayload("event/list/")
+        self.assertSamePayload("event/list/?page_size=1&page=2")
+        self.assertSamePayload("event/list/?name=Second")
+        self.assertSamePayload("event/{}/".format(self.event.id))
+        self.assertSamePayload("event/{}/results/".format(self.event.id))
+        self.assertSamePayload("event/{}/most-votes/".format(self.event.id))
+        self.assertSamePayload(
+            "event/{}/most-votes/?top=2".format(self.event.id))
+
+    def test_errors(self):
+        self.assertSamePayload("event/0/")
+        self.assertSamePayload("event/list/?page=9")
+        resp = self.assertSamePayload("event/list/?id=abc")
+        self.assertEqual(json.loads(resp.content),
+                         {"id": ["Enter a number."]})
+        for query in ("?pagination=cursor", "?cursor=abc"):
+            resp = self.client.get("/api/v1/async/event/list/" + query)
+            self.assertEqual(resp.status_code, 400)
+            self.assertContainsKeys(json.loads(resp.content), "pagination")
+        resp = self.assertSamePayload(
+            "event/{}/most-votes/?top=0".format(self.event.id))
+        self.assertEqual(resp.status_code, 400)
+
+        self.client.credentials()
+        resp = self.client.get("/api/v1/async/event/list/")
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(json.loads(resp.content)["detail"],
+                         "Authentication credentials were not provided.")
+        self.assertEqual(resp["WWW-Authenticate"], "Token")
+
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        resp = self.client.get("/api/v1/async/event/list/")
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(json.loads(resp.content)["detail"], "Invalid token.")
+
+    def test_conditional_get(self):
+        url = "/api/v1/async/event/{}/results/".format(self.event.id)
+        etag = self.client.get(url)["ETag"]
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], etag)
+
+    async def test_async_client_authenticates_on_cache_miss(self):
+        token_cache.clear()
+        resp = await self.async_client.get(
+            "/api/v1/async/event/{}/".format(self.event.id),
+            AUTHORIZATION="Token {}".format(self.token.key))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.content)["votes"], [
+            {"date": "2023-05-10", "people": ["Karl"]},
+            {"date": "2023-05-12", "people": ["Karl", "Ben"]}])
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+
+@override_settings(VOTE_BUFFER_ENABLED=True)
+class BufferedVoteTest(AuthenticatedEventAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, vote_buffer, "background",
+                        vote_buffer.background)
+        self.addCleanup(vote_buffer.flush)
+        vote_buffer.background = False
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        self.event = EventFactory(dates=[event_date])
+        self.url = "/api/v1/event/{}/vote/".format(self.event.id)
+
+    def receipt_status(self, receipt):
+        return self.client.get("/api/v1/vote-receipts/{}/".format(receipt))
+
+    def test_vote_is_committed_on_flush(self):
+        resp = self.client.post(self.url, {"name": "Karl",
+                                           "votes": ["2023-05-10"]})
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data["status"], "pending")
+        receipt = resp.data["receipt"]
+        resp = self.client.post(self.url, {"name": "Ben",
+                                           "votes": ["2023-05-10"]})
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(self.receipt_status(receipt).data["status"], "pending")
+        self.assertFalse(self.event.votes_set.exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(vote_buffer.flush(), 2)
+        # both votes are written by one insert in one transaction
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query["sql"].startswith("INSERT")
+                              and '"restAPI_votes"' in query["sql"]]), 1)
+
+        resp = self.receipt_status(receipt)
+        self.assertEqual(resp.data["status"], "committed")
+        self.assertEqual(resp.data["event"], self.event.id)
+        self.assertEqual(self.event.votes_set.count(), 2)
+        resp = self.client.get("/api/v1/event/{}/results/".format(self.event.id))
+        self.assertEqual(sorted(resp.data["suitabledates"][0]["people"]),
+                         ["Ben", "Karl"])
+
+    def test_invalid_vote_is_not_queued(self):
+        resp = self.client.post(self.url, {"name": "Karl",
+                                           "votes": ["2023-05-11"]})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(vote_buffer.size(), 0)
+
+    def test_full_buffer_is_refused(self):
+        self.addCleanup(setattr, vote_buffer, "max_size", vote_buffer.max_size)
+        vote_buffer.max_size = 1
+        resp = self.client.post(self.url, {"name": "Karl",
+                                           "votes": ["2023-05-10"]})
+        self.assertEqual(resp.status_code, 202)
+        resp = self.client.post(self.url, {"name": "Ben",
+                                           "votes": ["2023-05-10"]})
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp["Retry-After"], "1")
+
+    def test_vote_for_deleted_event_fails(self):
+        resp = self.client.post(self.url, {"name": "Karl",
+                                           "votes": ["2023-05-10"]})
+        self.event.delete()
+        vote_buffer.flush()
+        resp = self.receipt_status(resp.data["receipt"])
+        self.assertEqual(resp.data["status"], "failed")
+        self.assertEqual(resp.data["detail"], "Event does not exist")
+
+    def test_unknown_receipt(self):
+        resp = self.receipt_status("5b3cc1fe-4b0b-4ba8-9d1b-0a5f35e1b2a9")
+        self.assertEqual(resp.status_code, 404)
+
+    def test_removed_date_fails_only_its_votes(self):
+        removed = EventDateDataFactory(date_suggestion="2023-05-11")
+        other = EventFactory(dates=[removed])
+        resp = self.client.post("/api/v1/event/{}/vote/".format(other.id),
+                                {"name": "Karl", "votes": ["2023-05-11"]})
+        failed = resp.data["receipt"]
+        resp = self.client.post(self.url, {"name": "Ben",
+                                           "votes": ["2023-05-10"]})
+        committed = resp.data["receipt"]
+        other.dates.remove(removed)
+
+        self.assertEqual(vote_buffer.flush(), 2)
+        resp = self.receipt_status(failed)
+        self.assertEqual(resp.data["status"], "failed")
+        self.assertEqual(resp.data["detail"],
+                         "Voted dates were removed from the event")
+        self.assertEqual(self.receipt_status(committed).data["status"],
+                         "committed")
+        self.assertEqual(self.event.votes_set.count(), 1)
+
+    def test_receipt_of_another_process(self):
+        # issued and still queued elsewhere
+        self.assertEqual(self.receipt_status(new_receipt()).data["status"],
+                         "pending")
+        self.addCleanup(setattr, vote_buffer, "pending_seconds",
+                        vote_buffer.pending_seconds)
+        vote_buffer.pending_seconds = 0
+        self.assertEqual(self.receipt_status(new_receipt()).status_code, 404)
+
+
+class RequestMetricsTest(AuthenticatedEventAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        request_metrics.clear()
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        self.event = EventFactory(dates=[event_date])
+        VotesFactory(date_voted=event_date, event=self.event,
+                     user=PeopleFactory(event=self.event, name="Karl"))
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(
+                "/api/v1/event/{}/results/".format(self.event.id))
+        timing = dict(metric.strip().split(";", 1)
+                      for metric in resp["Server-Timing"].split(","))
+        self.assertEqual(set(timing), {"db", "serializer", "view"})
+        self.assertIn('desc="{} queries"'.format(len(queries)), timing["db"])
+
+    def test_metrics_endpoint(self):
+        url = "/api/v1/event/{}/results/".format(self.event.id)
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get("/api/v1/event/0/results/")
+
+        resp = self.client.get("/api/v1/metrics/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain"))
+        lines = force_str(resp.content).splitlines()
+        self.assertIn('eventscheduling_requests_total{route="event-results",'
+                      'method="GET",status="200"} 2', lines)
+        self.assertIn('eventscheduling_requests_total{route="event-results",'
+                      'method="GET",status="404"} 1', lines)
+        self.assertIn('eventscheduling_request_duration_seconds_count'
+                      '{route="event-results",method="GET"} 3', lines)
+        self.assertIn('eventscheduling_request_queries_bucket'
+                      '{route="event-results",method="GET",le="+Inf"} 3', lines)
+        serializer_sum = [line for line in lines if line.startswith(
+            'eventscheduling_request_serializer_seconds_sum'
+            '{route="event-results"')]
+        self.assertGreater(float(serializer_sum[0].split()[-1]), 0)
+        self.assertIn('eventscheduling_token_cache{stat="hits"}',
+                      " ".join(lines))
+
+    @override_settings(DEBUG=True)
+    async def test_async_views_stay_async(self):
+        client = AsyncClient()
+        # the middleware chain is built on the first request of a client,
+        # with DEBUG it logs every sync middleware adapted to it
+        with self.assertNoLogs("django.request", level="DEBUG"):
+            resp = await client.get(
+                "/api/v1/async/event/{}/".format(self.event.id),
+                AUTHORIZATION="Token {}".format(self.token.key))
+        self.assertEqual(resp.status_code, 200)
+        # the async ORM queries run on worker threads and are still counted
+        self.assertRegex(resp["Server-Timing"], r'desc="[1-9]\d* queries"')
+        self.assertIn('eventscheduling_requests_total{route="async-event-detail",'
+                      'method="GET",status="200"} 1',
+                      request_metrics.render())
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        resp = self.client.get("/api/v1/event/{}/".format(self.event.id))
+        self.assertFalse(resp.has_header("Server-Timing"))
+        self.assertFalse([line for line in request_metrics.render()
+                          if not line.startswith("#")])
+
+
+class SamplingProfilerTest(AuthenticatedEventAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(PROFILING_DIR=self.directory,
+                                     PROFILING_SAMPLE_RATE=0.0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.event = EventFactory(dates=[EventDateDataFactory()])
+        self.url = "/api/v1/event/{}/results/".format(self.event.id)
+
+    def test_header_needs_a_staff_token(self):
+        resp = self.client.get(self.url, HTTP_X_PROFILE="1")
+        self.assertFalse(resp.has_header("X-Profile"))
+        self.assertEqual(os.listdir(self.directory), [])
+
+        self.token.user.is_staff = True
+        self.token.user.save()
+        resp = self.client.get(self.url, HTTP_X_PROFILE="1")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["X-Profile"].startswith("event-results."))
+        self.assertEqual(os.listdir(self.directory), [resp["X-Profile"]])
+
+    def test_sample_rate(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            resp = self.client.get(self.url)
+        self.assertTrue(resp.has_header("X-Profile"))
+        resp = self.client.get(self.url)
+        self.assertFalse(resp.has_header("X-Profile"))
+
+    async def test_async_header_needs_a_staff_token(self):
+        url = "/api/v1/async/event/{}/results/".format(self.event.id)
+        headers = {"AUTHORIZATION": "Token {}".format(self.token.key),
+                   "X_PROFILE": "1"}
+        resp = await self.async_client.get(url, **headers)
+        self.assertFalse(resp.has_header("X-Profile"))
+
+        await User.objects.filter(pk=self.token.user_id).aupdate(is_staff=True)
+        resp = await self.async_client.get(url, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["X-Profile"].startswith("async-event-results."))
+
+
+class ResultsQueryOptionsTest(AuthenticatedEventAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        dates = [EventDateDataFactory(date_suggestion="2023-05-1{}".format(day))
+                 for day in range(3)]
+        self.event = EventFactory(dates=dates)
+        voters = [PeopleFactory(event=self.event, name=name)
+                  for name in ("Karl", "Ben", "Ann", "Eve", "Tom")]
+        for event_date, count in zip(dates, (5, 4, 3)):
+            for voter in voters[:count]:
+                VotesFactory(date_voted=event_date, user=voter,
+                             event=self.event)
+        self.url = "/api/v1/event/{}/results/".format(self.event.id)
+
+    def dates(self, resp):
+        self.assertEqual(resp.status_code, 200)
+        return [str(row["date"]) for row in resp.data["suitabledates"]]
+
+    def test_min_ratio(self):
+        self.assertEqual(self.dates(self.client.get(self.url)),
+                         ["2023-05-10"])
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.url, {"min_ratio": "0.8"})
+        self.assertEqual(self.dates(resp), ["2023-05-10", "2023-05-11"])
+        # conditional lookup, event and the three matrix reads
+        self.assertEqual(len(queries), 5)
+        self.assertEqual(resp.data["suitabledates"][1]["ratio"], 0.8)
+
+    def test_top(self):
+        resp = self.client.get(self.url, {"min_ratio": "0.1", "top": "2"})
+        self.assertEqual([(str(row["date"]), row["votes"])
+                          for row in resp.data["suitabledates"]],
+                         [("2023-05-10", 5), ("2023-05-11", 4)])
+
+        resp = self.client.get(self.url, {"top": "2"})
+        self.assertEqual(self.dates(resp), ["2023-05-10", "2023-05-11"])
+
+    def test_without(self):
+        resp = self.client.get(self.url + "?without=Tom&without=Eve")
+        self.assertEqual(self.dates(resp),
+                         ["2023-05-10", "2023-05-11", "2023-05-12"])
+        self.assertEqual(resp.data["suitabledates"][0]["people"],
+                         ["Karl", "Ben", "Ann"])
+
+        resp = self.client.get(self.url, {"without": "Nobody"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertContainsKeys(resp.data, "without")
+
+    def test_invalid_options(self):
+        for params in ({"min_ratio": "0"}, {"min_ratio": "1.5"},
+                       {"min_ratio": "most"}, {"top": "0"}):
+            resp = self.client.get(self.url, params)
+            self.assertEqual(resp.status_code, 400, params)
+            self.assertContainsKeys(resp.data, *params)
+
+    def test_async_results_options(self):
+        for query in ("?min_ratio=0.6&top=2", "?without=Tom", "?top=0"):
+            sync = self.client.get(self.url + query)
+            asynchronous = self.client.get(
+                "/api/v1/async/event/{}/results/{}".format(self.event.id,
+                                                           query))
+            self.assertEqual(asynchronous.status_code, sync.status_code)
+            self.assertEqual(json.loads(asynchronous.content),
+                             json.loads(sync.content))
+
+
+class BatchRetrieveTest(AuthenticatedEventAPITestCase):
+
+    def test_same_payload_as_detail(self):
+        events = [create_voted_event(2, 2), create_voted_event(1, 0)]
+        ids = ",".join(str(event.id) for event in events)
+        resp = self.client.get("/api/v1/event/batch/?ids={}".format(ids))
+        self.assertEqual(resp.status_code, 200)
+        for event, payload in zip(events, resp.data["events"]):
+            detail = self.client.get("/api/v1/event/{}/".format(event.id))
+            self.assertEqual(payload, detail.data)
+
+    def test_query_count_is_constant(self):
+        def batch_query_count(events):
+            ids = ",".join(str(event.id) for event in events)
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(
+                    "/api/v1/event/batch/?ids={}".format(ids))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(len(resp.data["events"]), len(events))
+            return len(queries)
+
+        small = [create_voted_event(1, 1)]
+        large = [create_voted_event(5, 4) for _ in range(10)]
+        # events, dates and votes
+        self.assertEqual(batch_query_count(small), 3)
+        self.assertEqual(batch_query_count(large), 3)
+
+    def test_missing_ids(self):
+        event = create_voted_event(1, 1)
+        missing = event.id + 1000
+        resp = self.client.get("/api/v1/event/batch/?ids={},{},{}".format(
+            missing, event.id, event.id))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["events"][0],
+                         {"id": missing, "detail": "Not found."})
+        self.assertEqual(resp.data["events"][1]["id"], event.id)
+        self.assertEqual(len(resp.data["events"]), 2)
+
+    def test_invalid_ids(self):
+        for ids in ("", "1,two", ",".join(str(pk) for pk in range(1, 102)),
+                    "1,99999999999999999999999", "0", "-1"):
+            resp = self.client.get("/api/v1/event/batch/", {"ids": ids})
+            self.assertEqual(resp.status_code, 400)
+            self.assertContainsKeys(resp.data, "ids")
+
+
+class SparseFieldsetTest(AuthenticatedEventAPITestCase):
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, len(queries)
+
+    def test_detail_fields(self):
+        event = create_voted_event(2, 2)
+        url = "/api/v1/event/{}/".format(event.id)
+        resp, full = self.query_count(url)
+        self.assertEqual(list(resp.data), ["id", "name", "dates", "votes"])
+
+        # no dates prefetch and no votes query
+        resp, sparse = self.query_count(url + "?fields=name")
+        self.assertEqual(resp.data, {"id": event.id, "name": event.name})
+        self.assertEqual(sparse, full - 2)
+
+        resp, omitted = self.query_count(url + "?omit=votes")
+        self.assertEqual(list(resp.data), ["id", "name", "dates"])
+        self.assertEqual(omitted, full - 1)
+
+    def test_results_and_most_votes_fields(self):
+        event = create_voted_event(2, 1)
+        base = "/api/v1/event/{}/".format(event.id)
+        resp, count = self.query_count(base + "results/?omit=suitabledates")
+        self.assertEqual(resp.data, {"id": event.id, "name": event.name})
+        # the updates lookup and the event, no tally query
+        self.assertEqual(count, 2)
+
+        resp = self.client.get(base + "most-votes/?fields=closest_suitable_date")
+        self.assertEqual(list(resp.data), ["id", "closest_suitable_date"])
+
+    def test_batch_without_votes(self):
+        events = [create_voted_event(2, 2) for _ in range(3)]
+        ids = ",".join(str(event.id) for event in events)
+        resp, count = self.query_count(
+            "/api/v1/event/batch/?ids={}&omit=votes".format(ids))
+        # events and dates
+        self.assertEqual(count, 2)
+        self.assertEqual([list(payload) for payload in resp.data["events"]],
+                         [["id", "name", "dates"]] * 3)
+
+    def test_list_date_count(self):
+        create_voted_event(3, 0)
+        resp = self.client.get("/api/v1/event/list/")
+        self.assertEqual(list(resp.data["events"][0]), ["id", "name"])
+
+        resp = self.client.get("/api/v1/event/list/?fields=id,name,date_count")
+        self.assertEqual(resp.data["events"][0]["date_count"], 3)
+        resp = self.client.get(
+            "/api/v1/event/list/?pagination=cursor&fields=date_count")
+        self.assertEqual(list(resp.data["events"][0]), ["id", "date_count"])
+
+    def test_unknown_field(self):
+        event = create_voted_event(1, 0)
+        for url, param in (
+                ("/api/v1/event/{}/?fields=name,secret", "fields"),
+                ("/api/v1/event/{}/results/?omit=votes", "omit"),
+                ("/api/v1/event/list/?fields=date_count,votes", "fields")):
+            resp = self.client.get(url.format(event.id))
+            self.assertEqual(resp.status_code, 400)
+            self.assertContainsKeys(resp.data, param)
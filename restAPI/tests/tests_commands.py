@@ -0,0 +1,276 @@
+import cProfile
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.authtoken.admin import User
+from restAPI.benchmarks import percentile
+from restAPI.models import Event, EventDateData, Votes, VoteTally
+from restAPI.profiling import prune_profiles, save_profile
+from restAPI.tallies import find_drift
+from tests.factories import create_token, EventFactory, \
+    EventDateDataFactory, VotesFactory, PeopleFactory
+
+
+class RebuildTalliesCommandTest(TestCase):
+
+    def setUp(self):
+        self.event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        self.event = EventFactory(dates=[self.event_date])
+        voter = PeopleFactory(event=self.event)
+        voter2 = PeopleFactory(event=self.event)
+        VotesFactory(date_voted=self.event_date, user=voter, event=self.event)
+        VotesFactory(date_voted=self.event_date, user=voter2, event=self.event)
+
+    def test_verify_up_to_date(self):
+        out = StringIO()
+        call_command("rebuild_tallies", "--verify", stdout=out)
+        self.assertIn("Tallies are up to date", out.getvalue())
+
+    def test_detect_and_repair_drift(self):
+        VoteTally.objects.filter(event=self.event).update(vote_count=5)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_tallies", "--verify", stdout=StringIO())
+
+        call_command("rebuild_tallies", stdout=StringIO())
+        tally = VoteTally.objects.get(event=self.event)
+        self.assertEqual((tally.vote_count, tally.participant_count), (2, 2))
+        call_command("rebuild_tallies", "--verify", stdout=StringIO())
+
+    def test_deletes_and_edits_keep_tallies(self):
+        # the way the admin changes single rows
+        other_date = EventDateDataFactory(date_suggestion="2023-05-11")
+        self.event.dates.add(other_date)
+        vote = Votes.objects.filter(event=self.event).first()
+        vote.date_voted = other_date
+        vote.save()
+        self.assertEqual(find_drift(), [])
+
+        vote.delete()
+        self.assertEqual(find_drift(), [])
+        vote.user.delete()
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(
+            list(VoteTally.objects.values_list(
+                "vote_count", "participant_count")), [(1, 1)])
+
+
+class ImportEventsCommandTest(TestCase):
+
+    def test_resume_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.ndjson")
+            records = [{"name": "Event {}".format(i), "dates": ["2023-05-10"]}
+                       for i in range(3)]
+            with open(path, "w") as import_file:
+                for record in records:
+                    import_file.write(json.dumps(record) + "\n")
+                import_file.write('{"name": "Event 3", "dates": []}\n')
+
+            with self.assertRaises(CommandError):
+                call_command("import_events", path, "--chunk_size=2",
+                             stdout=StringIO())
+            # the first chunk is committed and recorded in the checkpoint
+            self.assertEqual(Event.objects.count(), 2)
+            with open(path + ".checkpoint") as checkpoint:
+                self.assertEqual(checkpoint.read(), "2")
+
+            with open(path, "w") as import_file:
+                for record in records:
+                    import_file.write(json.dumps(record) + "\n")
+
+            out = StringIO()
+            call_command("import_events", path, "--chunk_size=2", stdout=out)
+            self.assertIn("Resuming after 2 records", out.getvalue())
+            self.assertEqual(
+                sorted(Event.objects.values_list("name", flat=True)),
+                ["Event 0", "Event 1", "Event 2"])
+            self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+
+class GcEventDatesCommandTest(TestCase):
+
+    def test_delete_orphaned_dates(self):
+        event_date = EventDateDataFactory()
+        EventFactory(dates=[event_date])
+        for _ in range(5):
+            EventDateDataFactory()
+
+        out = StringIO()
+        call_command("gc_event_dates", "--dry_run", stdout=out)
+        self.assertIn("5 orphaned dates", out.getvalue())
+
+        out = StringIO()
+        call_command("gc_event_dates", "--batch_size=2", "--pause=0",
+                     stdout=out)
+        self.assertIn("Done, deleted 5 orphaned dates", out.getvalue())
+        self.assertEqual(list(EventDateData.objects.values_list("id", flat=True)),
+                         [event_date.id])
+
+
+class ExportEventsCommandTest(TestCase):
+
+    def test_export_ndjson(self):
+        EventFactory(dates=[EventDateDataFactory(date_suggestion="2023-05-10")])
+        out = StringIO()
+        call_command("export_events", stdout=out)
+        event = json.loads(out.getvalue())
+        self.assertEqual(event["dates"], ["2023-05-10"])
+
+
+class BenchReadPathCommandTest(TransactionTestCase):
+    # the sync benchmark requests from other threads, which only see
+    # committed rows
+
+    def test_report(self):
+        event_date = EventDateDataFactory(date_suggestion="2023-05-10")
+        event = EventFactory(dates=[event_date])
+        VotesFactory(date_voted=event_date, event=event,
+                     user=PeopleFactory(event=event))
+        create_token(User.objects.create_user("user01"))
+
+        out = StringIO()
+        call_command("bench_read_path", "--endpoint", "results",
+                     "--requests", "4", "--concurrency", "2", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["results"]["wsgi"]["requests"], 4)
+        self.assertEqual(report["results"]["asgi"]["requests"], 4)
+        self.assertIn("p95_ms", report["results"]["asgi"])
+
+    def test_requires_a_token(self):
+        EventFactory()
+        with self.assertRaises(CommandError):
+            call_command("bench_read_path", stdout=StringIO())
+
+
+class SeedBenchmarkDataCommandTest(TestCase):
+
+    def test_seed(self):
+        out = StringIO()
+        call_command("seed_benchmark_data", "--events", "3", "--dates", "4",
+                     "--people", "2", "--votes", "3", "--chunk_size", "2",
+                     stdout=out)
+        self.assertIn("Seeded 3 events, 12 dates, 6 people and 18 votes",
+                      out.getvalue())
+        self.assertEqual(Event.objects.count(), 3)
+        self.assertEqual(Votes.objects.count(), 18)
+        self.assertEqual(find_drift(), [])
+
+    def test_same_seed_same_votes(self):
+        def seeded_votes(seed):
+            call_command("seed_benchmark_data", "--events", "2", "--seed",
+                         seed, stdout=StringIO())
+            votes = sorted(Votes.objects.values_list(
+                "user__name", "date_voted__date_suggestion"))
+            Event.objects.all().delete()
+            return votes
+
+        self.assertEqual(seeded_votes("7"), seeded_votes("7"))
+        self.assertNotEqual(seeded_votes("7"), seeded_votes("8"))
+
+    def test_more_votes_than_dates(self):
+        with self.assertRaises(CommandError):
+            call_command("seed_benchmark_data", "--dates", "2", "--votes",
+                         "3", stdout=StringIO())
+
+
+class PercentileTest(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(percentile(values, 0.50), 3)
+        self.assertEqual(percentile(values, 0.95), 5)
+        self.assertEqual(percentile(values, 0.0), 1)
+        self.assertEqual(percentile(list(range(1, 101)), 0.07), 7)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+class RunBenchmarksCommandTest(TestCase):
+
+    def test_report_and_clean_up(self):
+        call_command("seed_benchmark_data", "--events", "4",
+                     stdout=StringIO())
+        names = list(Event.objects.order_by("id").values_list(
+            "name", flat=True))
+        out = StringIO()
+        call_command("run_benchmarks", "--iterations", "2", "--label",
+                     "abc123", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["label"], "abc123")
+        self.assertEqual(set(report["endpoints"]),
+                         {"list", "detail", "results", "most-votes", "vote",
+                          "create", "update", "destroy"})
+        self.assertEqual(report["endpoints"]["results"]["requests"], 2)
+        self.assertIn("p99_ms", report["endpoints"]["vote"])
+        self.assertGreater(report["endpoints"]["detail"]["queries"]["p50"], 0)
+        # creates, votes, updates and deletes of the benchmark are undone
+        self.assertEqual(Event.objects.count(), 4)
+        self.assertEqual(names, list(Event.objects.order_by(
+            "id").values_list("name", flat=True)))
+        self.assertFalse(Votes.objects.filter(
+            user__name__startswith="Benchmark").exists())
+        self.assertEqual(find_drift(), [])
+
+    def test_more_iterations_than_events(self):
+        call_command("seed_benchmark_data", "--events", "2",
+                     stdout=StringIO())
+        out = StringIO()
+        call_command("run_benchmarks", "--iterations", "5", "--endpoint",
+                     "destroy", "--endpoint", "vote", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["endpoints"]["destroy"]["requests"], 5)
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_requires_events(self):
+        with self.assertRaises(CommandError):
+            call_command("run_benchmarks", stdout=StringIO())
+
+
+class AggregateProfilesCommandTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def profile(self, route, size=0):
+        profiler = cProfile.Profile()
+        profiler.runcall(sorted, range(size))
+        return save_profile(profiler, self.directory, route, 10 ** 9)
+
+    def test_top_functions_per_route(self):
+        self.profile("event-results")
+        self.profile("event-results")
+        self.profile("event-detail")
+
+        out = StringIO()
+        call_command("aggregate_profiles", "--dir", self.directory, "--json",
+                     stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["event-results"]["samples"], 2)
+        self.assertEqual(report["event-detail"]["samples"], 1)
+        self.assertIn("sorted", " ".join(
+            row["function"] for row in report["event-results"]["functions"]))
+
+        out = StringIO()
+        call_command("aggregate_profiles", "--dir", self.directory,
+                     "--route", "event-detail", stdout=out)
+        self.assertIn("event-detail (1 samples)", out.getvalue())
+        self.assertNotIn("event-results", out.getvalue())
+
+    def test_directory_is_bounded(self):
+        for _ in range(5):
+            self.profile("event-results")
+        size = os.path.getsize(os.path.join(self.directory,
+                                            os.listdir(self.directory)[0]))
+        self.assertEqual(prune_profiles(self.directory, size * 2), 3)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_no_profiles(self):
+        with self.assertRaises(CommandError):
+            call_command("aggregate_profiles", "--dir", self.directory,
+                         stdout=StringIO())
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from io import StringIO
+from unittest import skipUnless
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, \
+    TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from restAPI.caching import event_cache
+from restAPI.database import copy_sqlite_database
+from restAPI.middleware import ReadYourWritesMiddleware
+from restAPI.models import Event
+from restAPI.routers import PrimaryReplicaRouter, read_from_replicas
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 2500,
+    'cache_size': -8192,
+}
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite pragmas")
+class SqlitePragmasTest(SimpleTestCase):
+
+    def open_connection(self, name):
+        settings_dict = dict(connections.settings['default'], NAME=name)
+        wrapper = connections['default'].__class__(settings_dict, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @override_settings(SQLITE_PRAGMAS=SQLITE_PRAGMAS)
+    def test_pragmas_applied_on_connect(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = self.open_connection(os.path.join(directory.name, "db.sqlite3"))
+
+        with wrapper.cursor() as cursor:
+            values = dict()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute("PRAGMA {}".format(pragma))
+                values[pragma] = cursor.fetchone()[0]
+        # synchronous NORMAL reads back as 1
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1,
+                                  'busy_timeout': 2500, 'cache_size': -8192})
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_default_profile_keeps_sqlite_defaults(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = self.open_connection(os.path.join(directory.name, "db.sqlite3"))
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'delete')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], READ_YOUR_WRITES_WINDOW=5)
+class PrimaryReplicaRouterTest(TransactionTestCase):
+    # TestCase would wrap every test in a transaction, which pins the reads
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        event_cache().clear()
+
+    def test_reads_go_to_the_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Event), 'default')
+        with read_from_replicas():
+            self.assertEqual(self.router.db_for_read(Event), 'replica1')
+            # tokens and users must work before the next refresh
+            self.assertEqual(self.router.db_for_read(Token), 'default')
+            # a transaction reads what it is about to write
+            with transaction.atomic():
+                self.assertEqual(self.router.db_for_read(Event), 'default')
+        self.assertEqual(self.router.db_for_write(Event), 'default')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        with read_from_replicas():
+            self.assertEqual(self.router.db_for_read(Event), 'default')
+
+    def test_read_your_writes(self):
+        middleware = ReadYourWritesMiddleware(
+            lambda request: HttpResponse(self.router.db_for_read(Event)))
+        factory = RequestFactory()
+        karl = {"HTTP_AUTHORIZATION": "Token karl"}
+        ben = {"HTTP_AUTHORIZATION": "Token ben"}
+
+        self.assertEqual(middleware(factory.get("/", **karl)).content,
+                         b"replica1")
+        self.assertEqual(middleware(factory.post("/", **karl)).content,
+                         b"default")
+        self.assertEqual(middleware(factory.get("/", **karl)).content,
+                         b"default")
+        self.assertEqual(middleware(factory.get("/", **ben)).content,
+                         b"replica1")
+
+    async def test_read_your_writes_async(self):
+        async def view(request):
+            # like the async ORM, route on one of its worker threads
+            return HttpResponse(await sync_to_async(self.router.db_for_read)(
+                Event))
+
+        middleware = ReadYourWritesMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = RequestFactory()
+        ann = {"HTTP_AUTHORIZATION": "Token ann"}
+
+        self.assertEqual((await middleware(factory.get("/", **ann))).content,
+                         b"replica1")
+        await middleware(factory.post("/", **ann))
+        self.assertEqual((await middleware(factory.get("/", **ann))).content,
+                         b"default")
+
+    @override_settings(REPLICA_DATABASES=['replica1', 'replica2'])
+    async def test_one_replica_per_request(self):
+        # the cache key and the payload must come from the same replica
+        async def view(request):
+            aliases = [self.router.db_for_read(Event)]
+            for _ in range(3):
+                aliases.append(await sync_to_async(self.router.db_for_read)(
+                    Event))
+            return HttpResponse(" ".join(aliases))
+
+        middleware = ReadYourWritesMiddleware(view)
+        factory = RequestFactory()
+        chosen = set()
+        for _ in range(50):
+            response = await middleware(factory.get("/"))
+            aliases = set(response.content.decode().split())
+            self.assertEqual(len(aliases), 1)
+            chosen |= aliases
+        self.assertEqual(chosen, {'replica1', 'replica2'})
+
+
+class RefreshReplicasTest(SimpleTestCase):
+
+    def test_copy_database(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        primary = os.path.join(directory.name, "primary.sqlite3")
+        replica = os.path.join(directory.name, "replica.sqlite3")
+        with closing(sqlite3.connect(primary)) as db:
+            db.execute("CREATE TABLE event (name TEXT)")
+            db.execute("INSERT INTO event VALUES ('first')")
+            db.commit()
+
+        with closing(sqlite3.connect(replica)) as reader:
+            copy_sqlite_database(primary, replica)
+            self.assertEqual(
+                reader.execute("SELECT name FROM event").fetchall(),
+                [('first', )])
+
+            with closing(sqlite3.connect(primary)) as db:
+                db.execute("INSERT INTO event VALUES ('second')")
+                db.commit()
+            copy_sqlite_database(primary, replica)
+            # connections already open on the replica see the refresh
+            self.assertEqual(
+                reader.execute("SELECT count(*) FROM event").fetchone(), (2, ))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_requires_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command("refresh_replicas", stdout=StringIO())
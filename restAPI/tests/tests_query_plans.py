@@ -0,0 +1,76 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase
+from rest_framework.authtoken.admin import User
+from rest_framework.test import APITestCase
+from restAPI.caching import event_cache
+from tests.factories import create_token, EventFactory, EventDateDataFactory, \
+    VotesFactory, PeopleFactory
+from tests.query_plans import QueryPlanMixin, full_table_scans
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite only")
+class EndpointQueryPlanTest(QueryPlanMixin, APITestCase):
+
+    def setUp(self):
+        event_cache().clear()
+        user = User.objects.create_user(
+            'user01', 'user01@example.com', 'user01P4ssw0rD')
+        self.token = create_token(user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+
+        for _ in range(5):
+            event_dates = [EventDateDataFactory() for _ in range(4)]
+            self.event = EventFactory(dates=event_dates)
+            for _ in range(5):
+                voter = PeopleFactory(event=self.event)
+                for event_date in event_dates[:3]:
+                    VotesFactory(date_voted=event_date, user=voter,
+                                 event=self.event)
+        self.event_date = self.event.dates.first()
+
+    def test_list(self):
+        # the unfiltered page walks the events in primary key order
+        self.assertNoFullTableScans(
+            lambda: self.client.get("/api/v1/event/list/"),
+            allowed=("restAPI_event",))
+        self.assertNoFullTableScans(
+            lambda: self.client.get("/api/v1/event/list/?name=Test"))
+
+    def test_detail(self):
+        self.assertNoFullTableScans(
+            lambda: self.client.get("/api/v1/event/{}/".format(self.event.id)))
+
+    def test_results_and_most_votes(self):
+        self.assertNoFullTableScans(lambda: self.client.get(
+            "/api/v1/event/{}/results/".format(self.event.id)))
+        self.assertNoFullTableScans(lambda: self.client.get(
+            "/api/v1/event/{}/most-votes/?top=3".format(self.event.id)))
+
+    def test_vote(self):
+        resp = self.assertNoFullTableScans(lambda: self.client.post(
+            "/api/v1/event/{}/vote/".format(self.event.id),
+            {"name": "Karl", "votes": [str(self.event_date.date_suggestion)]}))
+        self.assertEqual(resp.status_code, 201)
+
+    def test_update_and_destroy(self):
+        resp = self.assertNoFullTableScans(lambda: self.client.put(
+            "/api/v1/event/{}/".format(self.event.id),
+            {"name": "Updated", "dates": ["2023-05-10"]}))
+        self.assertEqual(resp.status_code, 200)
+        resp = self.assertNoFullTableScans(lambda: self.client.delete(
+            "/api/v1/event/{}/".format(self.event.id)))
+        self.assertEqual(resp.status_code, 204)
+
+
+class FullTableScanTest(SimpleTestCase):
+
+    def test_plan_formats(self):
+        plans = [("SCAN restAPI_event", "a"),
+                 ("SCAN TABLE restAPI_votes", "b"),
+                 ("SCAN restAPI_people USING COVERING INDEX idx", "c"),
+                 ("SEARCH restAPI_event USING INTEGER PRIMARY KEY (rowid=?)",
+                  "d")]
+        self.assertEqual(full_table_scans(plans, allowed=("restAPI_people",)),
+                         [("restAPI_event", "a"), ("restAPI_votes", "b")])
@@ -0,0 +1,69 @@
+from datetime import date
+
+from django.test import SimpleTestCase
+from restAPI.scheduling import AvailabilityMatrix
+
+MAY_1, MAY_2, MAY_3 = date(2023, 5, 1), date(2023, 5, 2), date(2023, 5, 3)
+
+
+class AvailabilityMatrixTest(SimpleTestCase):
+
+    def setUp(self):
+        people = [(10, "Karl"), (11, "Ben"), (12, "Ann"), (13, "Eve"),
+                  (14, "Tom")]
+        dates = [(1, MAY_1), (2, MAY_2), (3, MAY_3)]
+        votes = [(10, 1), (11, 1), (12, 1), (13, 1), (14, 1),
+                 (10, 2), (11, 2), (12, 2), (13, 2),
+                 (10, 3), (11, 3), (12, 3)]
+        self.matrix = AvailabilityMatrix(people, dates, votes)
+
+    def test_full_availability(self):
+        self.assertEqual(self.matrix.schedule(), [{
+            "date": MAY_1, "people": ["Karl", "Ben", "Ann", "Eve", "Tom"],
+            "votes": 5, "ratio": 1.0}])
+
+    def test_quorum(self):
+        self.assertEqual([row["date"] for row in
+                          self.matrix.schedule(min_ratio=0.8)],
+                         [MAY_1, MAY_2])
+        self.assertEqual([row["date"] for row in
+                          self.matrix.schedule(min_ratio=0.6)],
+                         [MAY_1, MAY_2, MAY_3])
+
+    def test_top(self):
+        rows = self.matrix.schedule(min_ratio=0.1, top=2)
+        self.assertEqual([(row["date"], row["votes"]) for row in rows],
+                         [(MAY_1, 5), (MAY_2, 4)])
+
+    def test_top_alone_ranks_every_voted_date(self):
+        rows = self.matrix.schedule(top=3)
+        self.assertEqual([(row["date"], row["votes"]) for row in rows],
+                         [(MAY_1, 5), (MAY_2, 4), (MAY_3, 3)])
+
+    def test_top_ties_go_to_the_date_nearest_to_today(self):
+        # without Tom, May 1 and May 2 both have four votes
+        rows = self.matrix.schedule(top=2, without=["Tom"])
+        self.assertEqual([row["date"] for row in rows], [MAY_2, MAY_1])
+
+    def test_without(self):
+        rows = self.matrix.schedule(without=["Tom"])
+        self.assertEqual([(row["date"], row["ratio"]) for row in rows],
+                         [(MAY_1, 1.0), (MAY_2, 1.0)])
+        self.assertNotIn("Tom", rows[0]["people"])
+        rows = self.matrix.schedule(without=["Tom", "Eve"])
+        self.assertEqual(len(rows), 3)
+        with self.assertRaises(KeyError):
+            self.matrix.schedule(without=["Nobody"])
+
+    def test_everybody_dropped_out(self):
+        self.assertEqual(self.matrix.schedule(
+            without=["Karl", "Ben", "Ann", "Eve", "Tom"]), [])
+
+    def test_many_participants(self):
+        people = [(number, "Person {}".format(number))
+                  for number in range(3000)]
+        votes = [(number, 1) for number in range(3000)] + \
+            [(number, 2) for number in range(0, 3000, 2)]
+        matrix = AvailabilityMatrix(people, [(1, MAY_1), (2, MAY_2)], votes)
+        self.assertEqual([row["votes"] for row in
+                          matrix.schedule(min_ratio=0.5)], [3000, 1500])
@@ -1,9 +1,18 @@
 from django.urls import include, path
 from rest_framework import routers
-from .views import EventViewSet, EventListViewSet
+from .views import EventViewSet, EventListViewSet, CacheStatsView, \
+    MetricsView, VoteReceiptView
 
 urlpatterns = [
     path(r'event/list/', EventListViewSet.as_view(), name='event-list'),
+    path(r'event/', EventViewSet.as_view({'post': 'create',
+                                          'delete': 'bulk_destroy'}),
+         name='event-bulk'),
+    path(r'cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path(r'metrics/', MetricsView.as_view(), name='metrics'),
+    path(r'async/', include('restAPI.async_urls')),
+    path(r'vote-receipts/<uuid:receipt>/', VoteReceiptView.as_view(),
+         name='vote-receipt'),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
 
@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.db.models import Aggregate, JSONField, Subquery
+
+from .models import Votes
+
+
+class JSONGroupArray(Aggregate):
+    """
+    Collect the values of a group into a JSON array, so related names can
+    be returned in the same round trip as the aggregate they belong to.
+    """
+    function = 'JSON_GROUP_ARRAY'
+    output_field = JSONField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function='JSON_AGG',
+            template='%(function)s(%(distinct)s%(expressions)s)::text',
+            **extra_context)
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def group_voters_by_date(votes):
+    """
+    Fetch the voter names of a Votes queryset in a single joined query
+    and group them by the id of the voted date.
+    """
+    voters = defaultdict(list)
+    rows = votes.order_by('id').values_list('date_voted_id', 'user__name')
+    for date_id, name in rows:
+        voters[date_id].append(name)
+    return voters
+
+
+def group_voters_by_event(votes):
+    """
+    Like group_voters_by_date for the votes of many events, grouped by
+    event id first.
+    """
+    voters = defaultdict(lambda: defaultdict(list))
+    rows = votes.order_by('id').values_list('event_id', 'date_voted_id',
+                                            'user__name')
+    for event_id, date_id, name in rows:
+        voters[event_id][date_id].append(name)
+    return voters
+
+
+def voter_names(event, date):
+    """
+    Subquery collecting the names of everybody who voted on the given
+    event date into a JSON array.
+    """
+    return Subquery(Votes.objects.filter(event=event, date_voted=date)
+                    .order_by().values('date_voted')
+                    .annotate(names=JSONGroupArray('user__name'))
+                    .values('names'))
@@ -1,16 +1,32 @@
 from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status, mixins, generics
-from rest_framework.authentication import TokenAuthentication
+from rest_framework import viewsets, status, mixins, generics, views
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from .serializers import EventListSerializer, EventDetailSerializer, \
     CreateNewEventSerializer, CreateVoteSerializer, ResultSerializer, \
     MostVotedDateSerializer
-from .models import Event
+from .authentication import CachedTokenAuthentication, token_cache
+from .buffering import PENDING, VoteBufferFull, vote_buffer
+from .caching import cache_event_response, cache_stats
+from .cleanup import delete_events
+from .conditional import conditional_event_response
+from .exporters import CONTENT_TYPES as EXPORT_CONTENT_TYPES, \
+    FORMATS as EXPORT_FORMATS, export_lines, parse_since
+from .importers import import_events, read_records
+from .metrics import render_stats, request_metrics
+from .models import Event, Votes
+from .scheduling import schedule_options
+from .utils import group_voters_by_event
+from .voting import resolve_voted_dates
 
 
 class StandardEventPagination(PageNumberPagination):
@@ -27,15 +43,74 @@ class StandardEventPagination(PageNumberPagination):
         ]))
 
 
+class CursorEventPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering_query_param = 'order_by'
+    orderings = OrderedDict([
+        ('id', ('id', )),
+        ('created', ('-created', '-id')),
+    ])
+
+    def get_ordering(self, request, queryset, view):
+        order_by = request.query_params.get(self.ordering_query_param, 'id')
+        if order_by not in self.orderings:
+            raise ValidationError({self.ordering_query_param: [
+                "Must be one of: {}".format(", ".join(self.orderings))]})
+        return self.orderings[order_by]
+
+    def get_paginated_response(self, data):
+        # no count, counting every row is what makes deep pages slow
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('events', data)
+        ]))
+
+
 class EventViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
                    mixins.DestroyModelMixin, viewsets.GenericViewSet):
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     serializer_class = EventDetailSerializer
     queryset = Event.objects.all().order_by('id')
 
+    max_top_dates = 100
+    max_vote_batch = 10000
+    import_chunk_size = 1000
+    max_bulk_destroy = 1000
+    max_batch_retrieve = 100
+    # the largest value of the BigAutoField primary keys
+    max_event_id = 2 ** 63 - 1
+    export_chunk_size = 500
+    import_stream_formats = {
+        'application/x-ndjson': 'ndjson',
+        'text/csv': 'csv',
+    }
+    vote_batch_chunk_size = 500
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # the detail payload reads the dates twice, load them once up front
+        if self.action == 'vote' or (
+                self.action in ('retrieve', 'batch_retrieve') and
+                self.wants_dates()):
+            queryset = queryset.prefetch_related('dates')
+        return queryset
+
+    def wants_dates(self):
+        # dates and votes are the only detail fields that read the dates
+        wanted = EventDetailSerializer.wanted_fields(self.request.query_params)
+        return 'dates' in wanted or 'votes' in wanted
+
+    @conditional_event_response
+    @cache_event_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         serializer = CreateNewEventSerializer(data=request.data)
         if serializer.is_valid():
@@ -45,9 +120,113 @@ class EventViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'], url_path='batch',
+            url_name='batch')
+    def batch_retrieve(self, request):
+        allowed_methods = ["GET"]
+
+        if request.method not in allowed_methods:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        try:
+            ids = list(dict.fromkeys(
+                int(pk) for pk in
+                request.query_params.get('ids', '').split(',') if pk))
+        except ValueError:
+            ids = []
+        if not ids or len(ids) > self.max_batch_retrieve or not all(
+                1 <= pk <= self.max_event_id for pk in ids):
+            return Response(
+                {"ids": ["Must be a comma separated list of 1 to {} event "
+                         "ids".format(self.max_batch_retrieve)]},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        # at most three queries for the whole batch: events, dates and votes
+        events = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer()
+        if 'votes' in serializer.fields:
+            serializer.context["voters"] = group_voters_by_event(
+                Votes.objects.filter(event_id__in=ids))
+        return Response(
+            {"events": [serializer.to_representation(events[pk])
+                        if pk in events else
+                        {"id": pk, "detail": "Not found."} for pk in ids]},
+            status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk')
+    def bulk_import(self, request):
+        allowed_methods = ["POST"]
+
+        if request.method not in allowed_methods:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        try:
+            chunk_size = int(request.query_params.get(
+                'chunk_size', self.import_chunk_size))
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            return Response({"chunk_size": ["Must be a positive integer"]},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # ndjson and csv bodies are streamed line by line, json is parsed
+        media_type = request.content_type.split(';')[0].strip()
+        if media_type in self.import_stream_formats:
+            lines = (line.decode('utf-8') for line in request.stream or [])
+            records = read_records(lines,
+                                   self.import_stream_formats[media_type])
+        else:
+            records = request.data
+            if not isinstance(records, list):
+                return Response(
+                    ["Expected a list of events: [{name, dates}, ...]"],
+                    status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # the whole request is imported or nothing is
+            with transaction.atomic():
+                summary = import_events(records, chunk_size=chunk_size)
+        except ValueError as error:
+            return Response([str(error)], status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='export',
+            url_name='export')
+    def export(self, request):
+        allowed_methods = ["GET"]
+
+        if request.method not in allowed_methods:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        # not ?format=, that one picks the renderer
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return Response(
+                {"output": ["Must be one of: {}".format(
+                    ", ".join(EXPORT_FORMATS))]},
+                status=status.HTTP_400_BAD_REQUEST)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_since(since)
+            except ValueError as error:
+                return Response({"since": [str(error)]},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export_lines(fmt, since=since,
+                         chunk_size=self.export_chunk_size),
+            content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = \
+            'attachment; filename="events.{}"'.format(fmt)
+        return response
+
     def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
         event = self.get_object()
-        serializer = CreateNewEventSerializer(data=request.data)
+        serializer = CreateNewEventSerializer(
+            data=request.data, partial=partial,
+            context={"removed_votes": settings.REMOVED_DATE_VOTES})
         if serializer.is_valid():
             event = serializer.update(event, serializer.validated_data)
             return Response(
@@ -62,13 +241,28 @@ class EventViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
                 "message": "Event has been deleted",
                 "event": {"id": instance.id, "name": instance.name},
             }
-            for date in instance.dates.all():
-                date.delete()
-            instance.delete()
+            delete_events([instance.id])
             return Response(ret_json, status=status.HTTP_204_NO_CONTENT)
 
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_destroy(self, request, *args, **kwargs):
+        try:
+            ids = [int(pk) for pk in
+                   request.query_params.get('ids', '').split(',') if pk]
+        except ValueError:
+            ids = []
+        if not ids or len(ids) > self.max_bulk_destroy:
+            return Response(
+                {"ids": ["Must be a comma separated list of 1 to {} event "
+                         "ids".format(self.max_bulk_destroy)]},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        deleted = delete_events(ids)
+        return Response({"message": "Events have been deleted",
+                         "deleted": deleted},
+                        status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='vote', url_name='vote')
     def vote(self, request, pk):
         allowed_methods = ["POST"]
@@ -80,42 +274,103 @@ class EventViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
         serializer = CreateVoteSerializer(
             data=request.data
         )
+        if serializer.is_valid() and settings.VOTE_BUFFER_ENABLED:
+            return self.buffer_vote(instance, serializer.validated_data)
         if serializer.is_valid():
             serializer.update(instance, serializer.data)
             return Response(EventDetailSerializer(instance).data,
                             status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def buffer_vote(self, instance, validated_data):
+        # validate like CreateVoteSerializer.update, the write comes later
+        votes = validated_data.get("votes")
+        if not votes:
+            raise ValidationError("Please add a date to the votes")
+        event_dates = resolve_voted_dates(instance, votes).values()
+        try:
+            receipt = vote_buffer.submit(
+                instance.id, validated_data["name"],
+                {event_date.id for event_date in event_dates})
+        except VoteBufferFull:
+            return Response(
+                {"detail": "Too many votes waiting to be saved, retry later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"})
+        return Response({"id": instance.id, "receipt": receipt,
+                         "status": PENDING},
+                        status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='vote-batch',
+            url_name='vote-batch')
+    def vote_batch(self, request, pk):
+        allowed_methods = ["POST"]
+
+        if request.method not in allowed_methods:
+            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        instance = self.get_object()
+        serializer = CreateVoteSerializer(
+            data=request.data, many=True, max_length=self.max_vote_batch,
+            context={"chunk_size": self.vote_batch_chunk_size}
+        )
+        if serializer.is_valid():
+            summary = serializer.update(instance, serializer.validated_data)
+            return Response(dict(id=instance.id, **summary),
+                            status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['get'], url_path='results', url_name='results')
+    @conditional_event_response
+    @cache_event_response
     def results(self, request, pk):
         allowed_methods = ["GET"]
 
         if request.method not in allowed_methods:
             return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+        schedule = schedule_options(request.query_params,
+                                    self.max_top_dates)
         instance = self.get_object()
-        serializer = ResultSerializer(instance, data=request.data)
+        serializer = ResultSerializer(instance, data=request.data,
+                                      context={"schedule": schedule,
+                                               "request": request})
         if serializer.is_valid():
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['get'], url_path='most-votes',
             url_name='most-votes')
+    @conditional_event_response
+    @cache_event_response
     def most_votes(self, request, pk):
         allowed_methods = ["GET"]
 
         if request.method not in allowed_methods:
             return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+        top = request.query_params.get('top', 1)
+        try:
+            top = int(top)
+        except (TypeError, ValueError):
+            top = 0
+        if not 1 <= top <= self.max_top_dates:
+            return Response(
+                {"top": ["Must be an integer between 1 and {}".format(
+                    self.max_top_dates)]},
+                status=status.HTTP_400_BAD_REQUEST)
+
         instance = self.get_object()
-        serializer = MostVotedDateSerializer(instance, data=request.data)
+        serializer = MostVotedDateSerializer(instance, data=request.data,
+                                             context={"top": top,
+                                                      "request": request})
         if serializer.is_valid():
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class EventListViewSet(generics.ListAPIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     serializer_class = EventListSerializer
@@ -125,3 +380,64 @@ class EventListViewSet(generics.ListAPIView):
 
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['id', 'name']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        wanted = EventListSerializer.wanted_fields(self.request.query_params)
+        if 'date_count' in wanted:
+            queryset = queryset.annotate(date_count=Count('dates'))
+        return queryset
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor opts in to keyset pagination
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = CursorEventPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class CacheStatsView(views.APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"events": cache_stats(),
+                         "tokens": token_cache.stats()},
+                        status=status.HTTP_200_OK)
+
+
+class MetricsView(views.APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        lines = request_metrics.render()
+        lines += render_stats("event_cache", cache_stats(),
+                              "Event response cache counters")
+        lines += render_stats("token_cache", token_cache.stats(),
+                              "Token cache counters")
+        # Prometheus text exposition format
+        return HttpResponse("\n".join(lines) + "\n",
+                            content_type="text/plain; version=0.0.4")
+
+
+class VoteReceiptView(views.APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, receipt):
+        found = vote_buffer.status(receipt)
+        if found is None:
+            return Response({"detail": "Not found."},
+                            status=status.HTTP_404_NOT_FOUND)
+        if found == PENDING:
+            return Response({"receipt": receipt, "status": PENDING},
+                            status=status.HTTP_200_OK)
+        return Response({"receipt": receipt, "status": found.status,
+                         "event": found.event_id, "votes": found.votes,
+                         "detail": found.detail},
+                        status=status.HTTP_200_OK)
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from django.db import transaction
+from rest_framework import serializers
+
+from eventschedulingAPI import settings
+from .models import People, Votes
+from .tallies import rebuild_tallies
+from .utils import chunked
+
+
+def resolve_voted_dates(event, dates):
+    """
+    Look up the event dates for a list of voted date strings in one query.
+    Returns a dict of the voted date string to EventDateData, raises a
+    ValidationError when one of the dates does not belong to the event.
+    """
+    try:
+        voted_dates = {str(date): datetime.strptime(
+            str(date), settings.DATE_INPUT_FORMATS[0]).date() for date in dates}
+    except ValueError:
+        raise serializers.ValidationError("Voted date does not exist for event")
+
+    event_dates = {data.date_suggestion: data for data in
+                   event.dates.filter(date_suggestion__in=voted_dates.values())}
+    if not set(voted_dates.values()) <= set(event_dates):
+        raise serializers.ValidationError("Voted date does not exist for event")
+    return {date: event_dates[voted_date]
+            for date, voted_date in voted_dates.items()}
+
+
+def ingest_ballots(event, ballots, chunk_size=500):
+    """
+    Write the votes of many participants of an event in one transaction.
+    ballots maps a participant name to the EventDateData rows voted for.
+    People and votes are inserted with chunked bulk inserts, existing rows
+    are skipped. Returns the number of inserted and skipped votes.
+    """
+    names = list(ballots)
+    with transaction.atomic():
+        people = dict()
+        for chunk in chunked(names, chunk_size):
+            people.update(People.objects.filter(
+                event=event, name__in=chunk).values_list('name', 'id'))
+        People.objects.bulk_create(
+            [People(event=event, name=name)
+             for name in names if name not in people],
+            batch_size=chunk_size, ignore_conflicts=True)
+        for chunk in chunked([name for name in names if name not in people],
+                             chunk_size):
+            people.update(People.objects.filter(
+                event=event, name__in=chunk).values_list('name', 'id'))
+
+        existing = set()
+        for chunk in chunked(list(people.values()), chunk_size):
+            existing.update(Votes.objects.filter(
+                event=event, user_id__in=chunk).values_list(
+                'user_id', 'date_voted_id'))
+
+        requested = {(people[name], event_date.id)
+                     for name, event_dates in ballots.items()
+                     for event_date in event_dates}
+        new_votes = [Votes(event=event, user_id=user_id, date_voted_id=date_id)
+                     for user_id, date_id in sorted(requested - existing)]
+        Votes.objects.bulk_create(new_votes, batch_size=chunk_size,
+                                  ignore_conflicts=True)
+
+        # the bulk inserts skip the signals, recount the event tallies
+        rebuild_tallies([event.id])
+        event.touch()
+
+    return len(new_votes), len(requested) - len(new_votes)